@@ -0,0 +1,353 @@
+import gzip
+import json
+import random
+from argparse import ArgumentParser
+from base64 import b64decode
+from copy import deepcopy
+from io import BytesIO
+from threading import Lock, Thread
+from time import sleep
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from werkzeug.exceptions import HTTPException, NotFound, Unauthorized, InternalServerError
+from werkzeug.routing import Map, Rule
+from werkzeug.serving import make_server, BaseWSGIServer, WSGIRequestHandler
+from werkzeug.wrappers import Request, Response
+
+from benchmarks.payloads import test_data_payload, run_test_data_payload
+
+# Stand-in for the TPF backend at SERVER_URL. It implements the endpoints called by flask_app/server.py with
+# generated data of a configurable size, latency and error rate so that the frontend can be benchmarked and profiled
+# offline. Run it with `python -m benchmarks.backend --port 8000` and point SERVER_URL at it. Any email and password
+# can be used to login.
+
+SUCCESS = {"error": False, "message": str(), "error_fields": dict()}
+TEMPLATE_TYPES = ("pnr", "global", "aaa")
+
+
+class BackendOptions:
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 unauthorized_rate: float = 0.0, run_latency: float = 0.0, test_data_count: int = 100,
+                 variations: int = 4, cores: int = 4, fields: int = 10, field_length: int = 8, instructions: int = 2000,
+                 seed: int = 0, etags: bool = True, compress: bool = True):
+        self.latency: float = latency  # Seconds added to every response
+        self.jitter: float = jitter  # Up to these many seconds are added at random on top of the latency
+        self.error_rate: float = error_rate  # Fraction of requests answered with 500
+        self.unauthorized_rate: float = unauthorized_rate  # Fraction of requests answered with 401 (session timeout)
+        self.run_latency: float = run_latency  # Seconds added to every run on top of the latency (the TPF execution)
+        self.test_data_count: int = test_data_count
+        self.variations: int = variations  # Variations in the response of a run
+        self.cores: int = cores  # Cores in each test data
+        self.fields: int = fields  # Field data in each core, pnr, tpfdf and file
+        self.field_length: int = field_length  # Bytes of data of each field
+        self.instructions: int = instructions  # Instructions in each segment listing
+        self.seed: int = seed
+        self.etags: bool = etags  # Send an ETag with every GET and answer a matching If-None-Match with 304
+        self.compress: bool = compress  # Gzip responses of 1 KB or more when the request accepts it
+
+
+class StandInBackend:
+
+    def __init__(self, options: BackendOptions = None):
+        self.options: BackendOptions = options or BackendOptions()
+        self.random = random.Random(self.options.seed)
+        self.lock: Lock = Lock()
+        self.segments: List[str] = [f"ET{index:02}" for index in range(20)]
+        self.macros: List[str] = ["WA0AA", "EB0EB", "MI0MI", "TR1GAA", "TJ0TJ", "IY1IY"]
+        self.test_data: Dict[str, dict] = dict()
+        self.headers: List[dict] = list()
+        for index in range(self.options.test_data_count):
+            self._add_test_data(f"Test Data {index:04}", self.segments[index % len(self.segments)],
+                                f"user{index % 5}@example.com")
+        self.templates: List[dict] = [self._template(template_type, index) for template_type in TEMPLATE_TYPES
+                                      for index in range(5)]
+        self.url_map = Map([
+            Rule("/tokens", methods=["POST"], endpoint="tokens"),
+            Rule("/segments", methods=["GET"], endpoint="segments"),
+            Rule("/segments/upload", methods=["POST"], endpoint="upload"),
+            Rule("/segments/upload/batch", methods=["POST"], endpoint="upload_batch"),
+            Rule("/segments/<seg_name>/instructions", methods=["GET"], endpoint="instructions"),
+            Rule("/unsupported_instructions", methods=["GET"], endpoint="unsupported_instructions"),
+            Rule("/macros", methods=["GET"], endpoint="macros"),
+            Rule("/macros/<macro_name>/symbol_table", methods=["GET"], endpoint="symbol_table"),
+            Rule("/fields", methods=["POST"], endpoint="fields"),
+            Rule("/fields/<path:field_name>", methods=["GET"], endpoint="field"),
+            Rule("/test_data", methods=["GET"], endpoint="test_data_list"),
+            Rule("/test_data", methods=["POST"], endpoint="create_test_data"),
+            Rule("/test_data/<test_data_id>", methods=["GET"], endpoint="test_data"),
+            Rule("/test_data/<test_data_id>", methods=["DELETE"], endpoint="delete_test_data"),
+            Rule("/test_data/<test_data_id>/run", methods=["GET"], endpoint="run"),
+            Rule("/test_data/<test_data_id>/copy", methods=["POST"], endpoint="copy_test_data"),
+            Rule("/test_data/<test_data_id>/variations", methods=["GET"], endpoint="variations"),
+            Rule("/test_data/<test_data_id>/<path:element>", methods=["POST", "PATCH", "DELETE"],
+                 endpoint="update_test_data"),
+            Rule("/templates/name", methods=["GET"], endpoint="templates_by_name"),
+            Rule("/templates/<template_type>/test_data/<test_data_id>", methods=["GET"],
+                 endpoint="templates_and_variations"),
+            Rule("/templates/<template_id>", methods=["GET"], endpoint="template"),
+            Rule("/templates/<path:action>", methods=["POST", "DELETE"], endpoint="update_template"),
+            Rule("/test_results", methods=["GET"], endpoint="test_results"),
+            Rule("/test_results/delete", methods=["DELETE"], endpoint="success"),
+            Rule("/test_results/<test_result_id>", methods=["GET"], endpoint="test_result"),
+            Rule("/test_results/<test_result_id>/comment", methods=["POST"], endpoint="success"),
+        ])
+
+    def _add_test_data(self, name: str, seg_name: str, owner: str) -> dict:
+        header = {"id": str(uuid4()), "name": name, "seg_name": seg_name, "owner": owner}
+        self.headers.append(header)
+        self.test_data[header["id"]] = None  # Generated on first read
+        return header
+
+    def _get_test_data(self, test_data_id: str) -> dict:
+        if test_data_id not in self.test_data:
+            raise NotFound
+        with self.lock:
+            if self.test_data[test_data_id] is None:
+                header = next(header for header in self.headers if header["id"] == test_data_id)
+                test_data = test_data_payload(self.options.cores, self.options.fields, self.options.field_length)
+                test_data.update(header)
+                self.test_data[test_data_id] = test_data
+            return self.test_data[test_data_id]
+
+    @staticmethod
+    def _template(template_type: str, index: int) -> dict:
+        return {"id": str(uuid4()), "type": template_type.upper() if template_type != "global" else "Global",
+                "name": f"{template_type.upper()} Template {index}", "description": "Stand-in template",
+                "owner": "user0@example.com", "key": "name", "text": ["TEXT"], "field_data": str(),
+                "global_name": "@AAGLOBAL", "hex_data": str(), "is_global_record": False, "test_data_links": list(),
+                "count": 1}
+
+    @staticmethod
+    def _gzip(data: bytes) -> bytes:
+        # With a fixed mtime the same data is always compressed to the same bytes and so gets the same ETag.
+        # gzip.compress only takes mtime from Python 3.8.
+        buffer = BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=6, mtime=0) as gzip_file:
+            gzip_file.write(data)
+        return buffer.getvalue()
+
+    def __call__(self, environ, start_response):
+        request = Request(environ)
+        try:
+            response = self.dispatch(request)
+        except HTTPException as error:
+            response = error.get_response(environ)
+        return response(environ, start_response)
+
+    def dispatch(self, request: Request) -> Response:
+        adapter = self.url_map.bind_to_environ(request.environ)
+        endpoint, values = adapter.match()
+        delay = self.options.latency + self.random.uniform(0, self.options.jitter)
+        if delay:
+            sleep(delay)
+        if endpoint == "tokens":
+            return self._json(self.on_tokens(request))
+        if not request.headers.get("Authorization", str()).startswith("Bearer "):
+            raise Unauthorized
+        chance = self.random.random()
+        if chance < self.options.unauthorized_rate:
+            raise Unauthorized
+        if chance < self.options.unauthorized_rate + self.options.error_rate:
+            raise InternalServerError
+        response = self._json(getattr(self, f"on_{endpoint}")(request, **values))
+        if self.options.compress and "gzip" in request.accept_encodings and response.content_length >= 1024:
+            response.set_data(self._gzip(response.get_data()))
+            response.headers["Content-Encoding"] = "gzip"
+            response.vary.add("Accept-Encoding")
+        if self.options.etags and request.method == "GET":
+            response.add_etag()
+            response.make_conditional(request)
+        return response
+
+    @staticmethod
+    def _json(body) -> Response:
+        return Response(json.dumps(body), mimetype="application/json")
+
+    @staticmethod
+    def on_tokens(request: Request) -> dict:
+        email, _, _ = b64decode(request.headers.get("Authorization", "Basic ").split(" ")[-1]).decode().partition(":")
+        if not email:
+            raise Unauthorized
+        return {"email": email, "initial": email[:2].upper(), "role": "member", "domain": "general",
+                "token": f"stand-in-{email}"}
+
+    @staticmethod
+    def on_success(_: Request, **__) -> dict:
+        return dict(SUCCESS)
+
+    def on_segments(self, _: Request) -> dict:
+        return {"segments": self.segments, "attributes": {
+            seg_name: {"source": "lst", "file_type": "lst", "loc": self.options.instructions, "assembly_error": str(),
+                       "execution_percentage": 100} for seg_name in self.segments}}
+
+    @staticmethod
+    def on_upload(request: Request) -> dict:
+        return dict(SUCCESS, message=f"{request.json['blob_name']} uploaded successfully", warning=str())
+
+    def on_upload_batch(self, request: Request) -> dict:
+        return {"responses": {blob_name: dict(SUCCESS, message=f"{blob_name} uploaded successfully", warning=str())
+                              for blob_name in request.json["blob_names"]}}
+
+    def on_instructions(self, _: Request, seg_name: str) -> dict:
+        instructions = [f"{seg_name}.{index}:{'L' + str(index) if index % 10 == 0 else str()}:"
+                        f"{'BADOP' if index % 500 == 1 else 'LR'}:R1,R2" for index in range(self.options.instructions)]
+        return {"instructions": instructions, "not_supported": [ins for ins in instructions if ":BADOP:" in ins],
+                "constants": [{"label": "CONST1", "dsp": 0, "length": 4, "data": "C1C2C3C4"}], "literals": list()}
+
+    def on_unsupported_instructions(self, _: Request) -> dict:
+        return {"unsupported_instructions": [["BADOP", {seg_name: 1 for seg_name in self.segments[:3]}]]}
+
+    def on_macros(self, _: Request) -> dict:
+        return {"macros": self.macros}
+
+    def on_symbol_table(self, _: Request, macro_name: str) -> dict:
+        if macro_name not in self.macros:
+            return {"symbol_table": list()}
+        return {"symbol_table": [{"label": f"{macro_name[:3]}FLD{index:02}", "name": macro_name, "dsp": index * 4,
+                                  "dsp_hex": f"{index * 4:03X}", "length": 4} for index in range(50)]}
+
+    @staticmethod
+    def _label_ref(field_name: str) -> dict:
+        # Any field starting with the first 3 characters of a known macro is in that macro
+        macro_name = {"WA0": "WA0AA", "EB0": "EB0EB", "MI0": "MI0MI", "TR1": "TR1GAA", "TJ0": "TJ0TJ",
+                      "IY1": "IY1IY"}.get(field_name[:3].upper())
+        if not macro_name:
+            return dict()
+        return {"label": field_name.upper(), "name": macro_name, "dsp": 8, "length": 4}
+
+    def on_field(self, _: Request, field_name: str) -> dict:
+        label_ref = self._label_ref(field_name)
+        if not label_ref:
+            raise NotFound
+        return label_ref
+
+    def on_fields(self, request: Request) -> dict:
+        return {"fields": {field_name: self._label_ref(field_name) for field_name in request.json["fields"]}}
+
+    def on_test_data_list(self, request: Request):
+        args = request.args
+        if "name" in args:
+            return next((header for header in self.headers if header["name"] == args["name"]), dict())
+        with self.lock:
+            headers = list(self.headers)
+        owner, search = args.get("owner"), args.get("search", str()).upper()
+        headers = [header for header in headers if (not owner or header["owner"] == owner) and
+                   (not search or search in header["name"].upper())]
+        sort = args.get("sort", "name")
+        headers.sort(key=lambda header: header.get(sort, str()).upper(), reverse=args.get("order") == "desc")
+        start = int(args["cursor"]) if args.get("cursor", str()).isdigit() else 0
+        end = start + int(args.get("limit", len(headers)))
+        return {"test_data": headers[start:end], "next_cursor": str(end) if end < len(headers) else str(),
+                "total": len(headers)}
+
+    def on_create_test_data(self, request: Request) -> dict:
+        with self.lock:
+            header = self._add_test_data(request.json.get("name", "New"), request.json.get("seg_name", "ET00"),
+                                         "user0@example.com")
+        return dict(SUCCESS, id=header["id"])
+
+    def on_test_data(self, _: Request, test_data_id: str) -> dict:
+        return self._get_test_data(test_data_id)
+
+    def on_delete_test_data(self, _: Request, test_data_id: str) -> dict:
+        with self.lock:
+            if self.test_data.pop(test_data_id, False) is False:
+                raise NotFound
+            self.headers = [header for header in self.headers if header["id"] != test_data_id]
+        return {"test_data_id": test_data_id}
+
+    def on_run(self, _: Request, test_data_id: str) -> dict:
+        if self.options.run_latency:
+            sleep(self.options.run_latency)
+        run = run_test_data_payload(self.options.variations, self.options.cores, self.options.fields,
+                                    self.options.field_length)
+        run.update({key: value for key, value in self._get_test_data(test_data_id).items() if key != "outputs"})
+        run["test_data_variation"] = {"core": True, "pnr": False, "tpfdf": False, "file": False}
+        return run
+
+    def on_copy_test_data(self, _: Request, test_data_id: str) -> dict:
+        test_data = self._get_test_data(test_data_id)
+        with self.lock:
+            header = self._add_test_data(f"{test_data['name']} - Copy", test_data["seg_name"], test_data["owner"])
+            self.test_data[header["id"]] = dict(deepcopy(test_data), **header)
+        return {"id": header["id"]}
+
+    def on_variations(self, _: Request, test_data_id: str) -> dict:
+        self._get_test_data(test_data_id)
+        return {"variations": [{"variation": index, "variation_name": f"Variation {index}"} for index in range(4)]}
+
+    def on_update_test_data(self, _: Request, test_data_id: str, element: str) -> dict:
+        # Mutations are acknowledged without changing the generated test data
+        self._get_test_data(test_data_id)
+        return dict(SUCCESS, id=test_data_id, element=element)
+
+    def on_templates_by_name(self, request: Request) -> list:
+        return [template for template in self.templates if template["name"] == request.args.get("name")]
+
+    def on_templates_and_variations(self, _: Request, template_type: str, test_data_id: str) -> dict:
+        self._get_test_data(test_data_id)
+        return {"templates": [template for template in self.templates if template["type"].lower() == template_type],
+                "variation_choices": [[index, f"Variation {index}"] for index in range(4)]}
+
+    def on_template(self, _: Request, template_id: str):
+        if template_id in TEMPLATE_TYPES:
+            return [template for template in self.templates if template["type"].lower() == template_id]
+        template: Optional[dict] = next((template for template in self.templates if template["id"] == template_id),
+                                        None)
+        if not template:
+            raise NotFound
+        return template
+
+    @staticmethod
+    def on_update_template(_: Request, action: str) -> dict:
+        return dict(SUCCESS, action=action)
+
+    def on_test_results(self, request: Request) -> dict:
+        if "name" not in request.args:
+            return {"headers": [{"name": f"Result {index}", "seg_name": self.segments[index],
+                                 "owner": "user0@example.com"} for index in range(10)]}
+        return {"results": [{"id": "result", "name": request.args["name"], "owner": "user0@example.com",
+                             "core_fields": list(), "pnr_fields": list(), "core_field_data": list(),
+                             "pnr_field_data": list(), "dumps": list(), "messages": list(), "result_id": 1,
+                             "last_node": "ET00.1", "variation_name": str(), "core_comment": str(),
+                             "pnr_comment": str(), "user_comment": str()}],
+                "cores": list(), "pnr": list(), "tpfdf": list(), "files": list(),
+                "counters": {"core_variations": 1, "pnr_variations": 0, "tpfdf_variations": 0, "file_variations": 0,
+                             "dumps": 0, "messages": 0}}
+
+    @staticmethod
+    def on_test_result(_: Request, test_result_id: str) -> dict:
+        return dict(SUCCESS, data=[{"id": test_result_id, "name": "Result 0", "owner": "user0@example.com",
+                                    "comment": str(), "comment_type": str()}])
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_request(self, *args, **kwargs) -> None:
+        return
+
+
+def serve_in_thread(backend: StandInBackend, port: int = 0) -> Tuple[BaseWSGIServer, str]:
+    # Starts the backend on a daemon thread and returns the server and its url (an ephemeral port if port is 0)
+    server = make_server("127.0.0.1", port, backend, threaded=True, request_handler=QuietRequestHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = ArgumentParser(description="Stand-in TPF backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    defaults = BackendOptions()
+    for name, value in vars(defaults).items():
+        value_type = (lambda text: text.lower() != "false") if isinstance(value, bool) else type(value)
+        parser.add_argument(f"--{name.replace('_', '-')}", type=value_type, default=value)
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    make_server(host, port, StandInBackend(BackendOptions(**args)), threaded=True).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from base64 import b64encode, b64decode
+from os import urandom
+from timeit import repeat
+from typing import List
+
+from config import Config
+from flask_app.server import Server
+
+
+def legacy_decode_data(encoded_data) -> List[str]:
+    # The byte at a time decoder that Server._decode_data replaced. Kept here as the baseline.
+    data = b64decode(encoded_data)
+    hex_data = data.hex().upper()
+    number_data = "Not a number"
+    if not encoded_data:
+        return ["", number_data, str()]
+    if len(hex_data) <= 8:
+        number_data = int(hex_data, 16)
+    if len(hex_data) == 4 and number_data > 0x7FFF:
+        number_data -= 0x10000
+    if len(hex_data) == 8 and number_data > 0x7FFFFFFF:
+        number_data -= Config.REG_MAX + 1
+    char_data = "".join([bytes([char]).decode("cp037") if bytes([char]).decode("cp037").isascii() and char >= 0x40
+                         else "♦" for char in data])
+    return [hex_data, number_data, char_data]
+
+
+def main():
+    for size in (0, 1, 2, 4, 256):
+        for _ in range(100):
+            encoded_data = b64encode(urandom(size)).decode()
+            assert Server._decode_data(encoded_data) == legacy_decode_data(encoded_data)
+    assert Server._decode_data(b64encode(bytes(range(0x100))).decode()) == \
+           legacy_decode_data(b64encode(bytes(range(0x100))).decode())
+    print(f"{'Size':>8} {'Legacy (ms)':>12} {'Table (ms)':>12} {'Speedup':>8}")
+    for size in (16, 256, 1024, 4096, 16384, 65536):
+        encoded_data = b64encode(urandom(size)).decode()
+        number = max(1, 65536 // size)
+        legacy = min(repeat(lambda: legacy_decode_data(encoded_data), number=number, repeat=5)) / number
+        table = min(repeat(lambda: Server._decode_data(encoded_data), number=number, repeat=5)) / number
+        print(f"{size:>8} {legacy * 1000:>12.3f} {table * 1000:>12.3f} {legacy / table:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+from argparse import ArgumentParser
+from base64 import b64encode
+from importlib.util import find_spec
+from threading import Lock, Thread, Event
+from time import perf_counter, sleep, time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from benchmarks.backend import BackendOptions
+
+# Load test of the frontend served by gunicorn. Simulated analysts login and then repeatedly pick a task (list, view,
+# edit or run test data) by its weight with some think time in between, like a locust user. Every worker x thread
+# configuration is started in turn against the stand-in backend, so no TPF server is needed.
+#   python -m benchmarks.load_test --users 50 --configs 1x8,2x8,4x8 --duration 60
+#   python -m benchmarks.load_test --scenario run --users 50 --think-time 0 --run-latency 5
+#   python -m benchmarks.load_test --scenario run --users 200 --think-time 0 --run-latency 5 --configs 1x8 --asgi
+#   python -m benchmarks.load_test --target https://tpf2.example.com --users 10   (an already running frontend)
+
+SCENARIOS: Dict[str, Dict[str, int]] = {
+    "mix": {"list": 3, "view": 4, "edit": 1, "run": 2},
+    "list": {"list": 1},
+    "view": {"view": 1},
+    "edit": {"edit": 1},
+    "run": {"run": 1},
+}
+CSRF_TOKEN = re.compile(r"name=\"csrf_token\" type=\"hidden\" value=\"([^\"]+)\"")
+TEST_DATA_ID = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+TEST_DATA_LINK = re.compile(rf"/test_data/({TEST_DATA_ID.pattern})\"")
+PERCENTILES: Tuple[int, ...] = (50, 90, 95, 99)
+
+
+class Stats:
+    # Samples of every request by name. A sample is (start time, seconds, error message or empty string).
+
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[float, float, str]]] = dict()
+        self._lock: Lock = Lock()
+
+    def add(self, name: str, start: float, seconds: float, error: str = str()) -> None:
+        with self._lock:
+            self.samples.setdefault(name, list()).append((start, seconds, error))
+
+    @staticmethod
+    def _percentile(times: List[float], percent: int) -> float:
+        # Nearest rank percentile of sorted times
+        return times[min(len(times) - 1, max(0, round(percent / 100 * len(times)) - 1))]
+
+    def summary(self, duration: float) -> Dict[str, dict]:
+        with self._lock:
+            samples = {name: list(name_samples) for name, name_samples in self.samples.items()}
+        samples["Total"] = [sample for name_samples in samples.values() for sample in name_samples]
+        summary = dict()
+        for name, name_samples in samples.items():
+            times = sorted(seconds for _, seconds, _ in name_samples)
+            errors = [error for _, _, error in name_samples if error]
+            row = {"requests": len(times), "errors": len(errors),
+                   "error_rate": len(errors) / len(times) if times else 0,
+                   "rps": len(times) / duration if duration else 0, "max": times[-1] if times else 0,
+                   "top_errors": {error: errors.count(error) for error in sorted(set(errors), key=errors.count,
+                                                                                 reverse=True)[:3]}}
+            row.update({f"p{percent}": self._percentile(times, percent) if times else 0 for percent in PERCENTILES})
+            summary[name] = row
+        return summary
+
+
+class Analyst:
+    # One simulated user with its own session (cookies) on a thread of its own
+
+    def __init__(self, index: int, base_url: str, stats: Stats, tasks: Dict[str, int], think_time: float,
+                 timeout: float):
+        self.email: str = f"user{index % 5}@example.com"  # Owners of the stand-in test data
+        self.base_url: str = base_url
+        self.stats: Stats = stats
+        self.task_names: List[str] = list(tasks)
+        self.task_weights: List[int] = list(tasks.values())
+        self.think_time: float = think_time
+        self.timeout: float = timeout
+        self.random = random.Random(index)
+        self.session = requests.Session()
+        self.test_data_ids: List[str] = list()
+
+    def request(self, name: str, method: str, url: str, redirect: bool = False, **kwargs) \
+            -> Optional[requests.Response]:
+        # Redirects are not followed so that every request is timed on its own. Pages answer backend errors with a
+        # redirect to another page and session timeouts with a redirect to logout, so a page that redirects is an
+        # error. Forms that are accepted redirect and the ones that are not are shown again.
+        start = time()
+        timer = perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{url}", allow_redirects=False,
+                                            timeout=self.timeout, **kwargs)
+        except requests.RequestException as error:
+            self.stats.add(name, start, perf_counter() - timer, type(error).__name__)
+            return None
+        seconds = perf_counter() - timer
+        location = response.headers.get("Location", str()).replace(self.base_url, str()).split("?")[0]
+        if response.status_code >= 400:
+            error = f"HTTP {response.status_code}"
+        elif response.is_redirect and (not redirect or location in ("/login", "/logout")):
+            error = f"Redirected to {TEST_DATA_ID.sub('[id]', location)}"
+        elif redirect and not response.is_redirect:
+            error = "Form not accepted"
+        else:
+            error = str()
+        self.stats.add(name, start, seconds, error)
+        return response if not error else None
+
+    def csrf_token(self, name: str, url: str) -> Optional[str]:
+        response = self.request(name, "GET", url)
+        match = CSRF_TOKEN.search(response.text) if response else None
+        return match.group(1) if match else None
+
+    def login(self) -> bool:
+        csrf_token = self.csrf_token("GET /login", "/login")
+        if not csrf_token:
+            return False
+        response = self.request("POST /login", "POST", "/login", redirect=True,
+                                data={"csrf_token": csrf_token, "email": self.email, "password": "load-test"})
+        return response is not None
+
+    def list(self) -> None:
+        url = self.random.choice(["/my_test_data", "/test_data"])
+        response = self.request(f"GET {url}", "GET", url)
+        if response:
+            self.test_data_ids = TEST_DATA_LINK.findall(response.text) or self.test_data_ids
+
+    def view(self) -> None:
+        self.request("GET /test_data/[id]", "GET", f"/test_data/{self.random.choice(self.test_data_ids)}")
+
+    def edit(self) -> None:
+        url = f"/test_data/{self.random.choice(self.test_data_ids)}/input/regs"
+        csrf_token = self.csrf_token("GET /test_data/[id]/input/regs", url)
+        if not csrf_token:
+            return
+        self.request("POST /test_data/[id]/input/regs", "POST", url, redirect=True,
+                     data={"csrf_token": csrf_token, "reg": f"R{self.random.randrange(16)}",
+                           "field_data": f"{self.random.getrandbits(32):08X}", "save": "Save"})
+
+    def run(self) -> None:
+        self.request("GET /test_data/[id]/run", "GET", f"/test_data/{self.random.choice(self.test_data_ids)}/run")
+
+    def start(self, stop: Event) -> None:
+        if not self.login():
+            return
+        while not stop.is_set():
+            task = self.random.choices(self.task_names, self.task_weights)[0]
+            if not self.test_data_ids:
+                task = "list"
+            getattr(self, task)()
+            if self.think_time:
+                stop.wait(self.random.expovariate(1 / self.think_time))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def stop_process(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def wait_till_up(url: str, process: subprocess.Popen, seconds: float = 60) -> None:
+    # The process is stopped if it does not come up so that it is not left running
+    deadline = perf_counter() + seconds
+    while perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with {process.returncode}")
+        try:
+            requests.get(url, timeout=5)
+            return
+        except requests.RequestException:
+            sleep(0.1)
+    stop_process(process)
+    raise RuntimeError(f"{url} did not come up in {seconds} seconds")
+
+
+def start_backend(options: BackendOptions) -> Tuple[subprocess.Popen, str]:
+    # The backend runs in a process of its own so that it does not compete with the simulated users for the GIL
+    port = free_port()
+    args = [sys.executable, "-m", "benchmarks.backend", "--port", str(port)]
+    for name, value in vars(options).items():
+        args.extend([f"--{name.replace('_', '-')}", str(value)])
+    process = subprocess.Popen(args, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    wait_till_up(url, process)
+    return process, url
+
+
+def start_frontend(workers: int, threads: int, backend_url: str, asgi: bool = False) -> Tuple[subprocess.Popen, str]:
+    # Same gunicorn command as the Dockerfile. All workers need the same SECRET_KEY to accept each other's sessions.
+    # In the async mode the threads are the ones that render pages.
+    port = free_port()
+    env = dict(os.environ, SERVER_URL=backend_url, SECRET_KEY=os.environ.get("SECRET_KEY") or
+               b64encode(os.urandom(24)).decode(), ASYNC_THREADS=str(threads))
+    args = [sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--log-level",
+            "warning"]
+    args.extend(["-k", "uvicorn.workers.UvicornWorker", "flask_app.asgi:asgi_app"] if asgi else
+                ["--threads", str(threads), "flask_app:tpf2_app"])
+    process = subprocess.Popen(args, env=env)
+    url = f"http://127.0.0.1:{port}"
+    wait_till_up(f"{url}/login", process)
+    return process, url
+
+
+def load(base_url: str, users: int, ramp_up: float, duration: float, tasks: Dict[str, int], think_time: float,
+         timeout: float) -> Dict[str, dict]:
+    # Users are started evenly over the ramp up and all of them are stopped at the end of the duration. Requests in
+    # flight are allowed to complete and are counted.
+    stats = Stats()
+    stop = Event()
+    threads = list()
+    start = perf_counter()
+    for index in range(users):
+        analyst = Analyst(index, base_url, stats, tasks, think_time, timeout)
+        thread = Thread(target=analyst.start, args=(stop,), daemon=True)
+        thread.start()
+        threads.append(thread)
+        if ramp_up and index < users - 1:
+            sleep(ramp_up / users)
+    sleep(max(0.0, duration - (perf_counter() - start)))
+    stop.set()
+    for thread in threads:
+        thread.join(timeout)
+    return stats.summary(perf_counter() - start)
+
+
+def print_summary(title: str, summary: Dict[str, dict]) -> None:
+    print(f"\n{title}")
+    print(f"{'Request':<36} {'Reqs':>7} {'Fails':>7} {'Err %':>6} {'Req/s':>7} " +
+          " ".join(f"{f'p{percent}':>7}" for percent in PERCENTILES) + f" {'Max':>7}  (seconds)")
+    for name, row in summary.items():
+        print(f"{name:<36} {row['requests']:>7} {row['errors']:>7} {row['error_rate'] * 100:>6.1f} "
+              f"{row['rps']:>7.2f} " +
+              " ".join(f"{row[f'p{percent}']:>7.3f}" for percent in PERCENTILES) + f" {row['max']:>7.3f}")
+    for name, row in summary.items():
+        for error, count in row["top_errors"].items():
+            if name != "Total":
+                print(f"  {name}: {count} x {error}")
+
+
+def main():
+    parser = ArgumentParser(description="Load test of the frontend with simulated analysts")
+    parser.add_argument("--users", type=int, default=50, help="Number of concurrent analysts")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Seconds over which the analysts are started")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run each configuration")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mix", help="Tasks of the analysts after login")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds between two tasks of an analyst")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds after which a request is a failure")
+    parser.add_argument("--configs", default="1x1,1x8,2x8,4x8",
+                        help="Comma separated gunicorn configurations as workers x threads")
+    parser.add_argument("--asgi", action="store_true", help="Serve the async mode with uvicorn workers")
+    parser.add_argument("--target", help="Load test this running frontend instead of starting gunicorn")
+    parser.add_argument("--output", help="Save the results as json to this file")
+    defaults = BackendOptions(latency=0.05, jitter=0.1, run_latency=1.0)
+    for name, value in vars(defaults).items():
+        value_type = (lambda text: text.lower() != "false") if isinstance(value, bool) else type(value)
+        parser.add_argument(f"--{name.replace('_', '-')}", type=value_type, default=value,
+                            help="Option of the stand-in backend")
+    args = parser.parse_args()
+    options = BackendOptions(**{name: getattr(args, name) for name in vars(defaults)})
+    tasks = SCENARIOS[args.scenario]
+    results = list()
+    if args.target:
+        summary = load(args.target.rstrip("/"), args.users, args.ramp_up, args.duration, tasks, args.think_time,
+                       args.timeout)
+        print_summary(f"{args.target} - {args.users} users - {args.scenario}", summary)
+        results.append({"config": args.target, "summary": summary})
+    else:
+        if not find_spec("gunicorn"):
+            sys.exit("gunicorn is not installed. Install it with `pip install gunicorn` as done in the Dockerfile.")
+        backend, backend_url = start_backend(options)
+        try:
+            for config in args.configs.split(","):
+                workers, threads = (int(value) for value in config.lower().split("x"))
+                frontend, url = start_frontend(workers, threads, backend_url, args.asgi)
+                try:
+                    summary = load(url, args.users, args.ramp_up, args.duration, tasks, args.think_time, args.timeout)
+                finally:
+                    stop_process(frontend)
+                mode = "asgi" if args.asgi else "wsgi"
+                print_summary(f"{mode} --workers {workers} --threads {threads} - {args.users} users - {args.scenario}",
+                              summary)
+                results.append({"config": config, "mode": mode, "workers": workers, "threads": threads,
+                                "summary": summary})
+        finally:
+            stop_process(backend)
+    print(f"\n{'Configuration':<24} {'Req/s':>8} {'p95':>8} {'p99':>8} {'Err %':>7}")
+    for result in results:
+        total = result["summary"]["Total"]
+        print(f"{result['config']:<24} {total['rps']:>8.2f} {total['p95']:>8.3f} {total['p99']:>8.3f} "
+              f"{total['error_rate'] * 100:>7.1f}")
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"users": args.users, "scenario": args.scenario, "think_time": args.think_time,
+                       "duration": args.duration, "backend": vars(options), "results": results}, output_file,
+                      indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from base64 import b64encode
+from os import urandom
+
+
+def _field_data(prefix: str, count: int, length: int) -> list:
+    return [{"field": f"{prefix}{index:04}", "data": b64encode(urandom(length)).decode()} for index in range(count)]
+
+
+def test_data_payload(cores: int = 4, fields: int = 10, length: int = 8) -> dict:
+    return {
+        "id": "test_data_id", "name": "Benchmark", "owner": "owner@example.com", "seg_name": "ETA1",
+        "stop_segments": ["ETA2"], "startup_script": str(), "regs": {"R1": 1, "R2": -1},
+        "cores": [{"id": f"core{index}", "variation": index % 4, "variation_name": str(), "ecb_level": str(),
+                   "heap_name": f"HEAP{index}", "macro_name": str(), "global_name": str(),
+                   "hex_data": b64encode(urandom(length)).decode(), "seg_name": str(), "original_field_data": str(),
+                   "is_global_record": False, "link": str(), "link_status": str(),
+                   "field_data": _field_data("WA0", fields, length)} for index in range(cores)],
+        "pnr": [{"id": "pnr", "variation": 0, "variation_name": str(), "locator": str(), "key": "name", "data": str(),
+                 "link": str(), "text": list(), "field_data": list(),
+                 "field_data_item": [dict(item, item_number=1) for item in _field_data("PR00", fields, length)]}],
+        "tpfdf": [{"id": "tpfdf", "variation": 0, "variation_name": str(), "macro_name": "TR1GAA", "key": "40",
+                   "field_data": _field_data("TR1G", fields, length)}],
+        "fixed_files": [{"id": "file", "variation": 0, "variation_name": str(), "macro_name": "TJ0TJ", "fixed_type": 5,
+                         "fixed_ordinal": 1, "fixed_forward_chain_label": str(), "fixed_forward_chain_count": 0,
+                         "rec_id": 0xC1C2, "field_data": _field_data("TJ0", fields, length),
+                         "file_items": [{"field": "TJ0ITM", "count_field": str(), "adjust": False, "repeat": 1,
+                                         "field_data": _field_data("TJ0I", fields, length)}],
+                         "pool_files": [{"macro_name": "IY1IY", "index_field": "TJ0ITM", "rec_id": 0xC3C4,
+                                         "field_data": _field_data("IY1", fields, length), "file_items": list()}]}],
+        "outputs": [{"cores": [{"macro_name": "WA0AA", "base_reg": str(),
+                                "field_data": [{"field": f"WA0{index:04}", "length": length, "data": str()}
+                                               for index in range(fields)]}],
+                     "pnr_outputs": list(), "regs": {"R1": 0}, "debug": list()}],
+    }
+
+
+def run_test_data_payload(variations: int = 10, cores: int = 4, fields: int = 10, length: int = 8) -> dict:
+    test_data = test_data_payload(cores, fields, length)
+    test_data["test_data_variation"] = {"core": True, "pnr": False, "tpfdf": False, "file": False}
+    test_data["outputs"] = [
+        {"result_id": index + 1, "variation": {"core": index}, "variation_name": {"core": f"Variation {index}"},
+         "last_node": "ETA1.10", "dumps": list(), "messages": list(), "traces": list(), "debug": list(),
+         "regs": {f"R{reg}": reg for reg in range(16)},
+         "cores": [{"macro_name": f"WA{core}AA", "base_reg": "R1", "field_data": _field_data("WA0", fields, length)}
+                   for core in range(cores)],
+         "pnr_outputs": [{"id": "pnr_output", "key": "name", "locator": str(), "field_item_len": list(),
+                          "field_data": [dict(item, field_text=item["field"])
+                                         for item in _field_data("PR00", fields, length)]}]}
+        for index in range(variations)]
+    return test_data
@@ -0,0 +1,60 @@
+import json
+import tracemalloc
+from functools import partial
+from io import BytesIO
+from time import perf_counter
+
+from requests import Response
+
+from benchmarks.payloads import run_test_data_payload
+from config import Config
+from flask_app.json_stream import JsonStream
+from flask_app.server import Server, LazyData
+
+# Peak memory of reading and decoding a run of test data with many variations. Buffered is the whole body read and
+# parsed before the outputs are decoded (STREAM_RUN_RESPONSE=false). Streamed is the body parsed while it is read with
+# each output decoded as soon as it is parsed (the default). The body is read from memory in place of the connection.
+#   python -m benchmarks.run_test_data_memory
+
+
+def _response(body: bytes) -> Response:
+    response = Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json"
+    response.raw = BytesIO(body)
+    return response
+
+
+def buffered(body: bytes):
+    return Server._decode_run_test_data(_response(body).json(object_hook=LazyData.json_hook))
+
+
+def streamed(body: bytes):
+    stream = JsonStream(_response(body).iter_content(chunk_size=Config.STREAM_CHUNK_SIZE),
+                        object_hook=LazyData.json_hook)
+    return Server._decode_run_test_data(stream.load({"outputs": partial(Server._decode_output, run=True)}))
+
+
+def measure(read, body: bytes) -> tuple:
+    tracemalloc.start()
+    start = perf_counter()
+    test_data = read(body)
+    seconds = perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del test_data
+    return retained, peak, seconds
+
+
+def main():
+    print(f"{'Variations':>10} {'Body (MB)':>10} {'Read':>9} {'Retained (MB)':>14} {'Peak (MB)':>10} {'Seconds':>8}")
+    for variations in (10, 50, 200):
+        body = json.dumps(run_test_data_payload(variations=variations, cores=8, fields=40, length=16)).encode()
+        for name, read in (("buffered", buffered), ("streamed", streamed)):
+            retained, peak, seconds = measure(read, body)
+            print(f"{variations:>10} {len(body) / 2 ** 20:>10.2f} {name:>9} {retained / 2 ** 20:>14.2f} "
+                  f"{peak / 2 ** 20:>10.2f} {seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import json
+import platform
+import subprocess
+import sys
+from argparse import ArgumentParser
+from base64 import b64encode
+from datetime import datetime
+from functools import partial
+from random import Random
+from statistics import mean, median, stdev
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from benchmarks.backend import StandInBackend, BackendOptions, serve_in_thread
+from config import Config
+
+# Benchmarks of the page rendering and decode hot paths. Pages are requested through the Flask test client from the
+# stand-in backend at each payload size. Results are saved as json and can be compared with an earlier run.
+#   python -m benchmarks.suite --output results.json
+#   python -m benchmarks.suite --compare results.json --threshold 1.2
+
+SIZES: Dict[str, BackendOptions] = {
+    "small": BackendOptions(test_data_count=20, variations=1, cores=2, fields=5, field_length=4, instructions=200),
+    "medium": BackendOptions(test_data_count=500, variations=4, cores=8, fields=40, field_length=8,
+                             instructions=5000),
+    "huge": BackendOptions(test_data_count=5000, variations=16, cores=32, fields=100, field_length=32,
+                           instructions=20000),
+}
+PAGES: Dict[str, str] = {
+    "get_test_data": "/test_data/{test_data_id}",
+    "run_test_data": "/test_data/{test_data_id}/run",
+    "instructions": "/segments/ET01/instructions",
+    "get_test_results": "/test_results",
+    "get_test_result": "/test_results?name=Result%200",
+    "my_test_data": "/my_test_data",
+    "pnr_templates": "/templates/PNR",
+    "global_templates": "/templates/Global",
+}
+
+
+def measure(func: Callable, min_rounds: int = 5, max_time: float = 2.0, min_round_time: float = 0.002) -> dict:
+    # Calibrates the iterations so that a round takes at least min_round_time, then runs rounds till max_time is used
+    # up (but at least min_rounds). The statistics are of the time of a single iteration.
+    func()
+    iterations = 1
+    while True:
+        start = perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = perf_counter() - start
+        if elapsed >= min_round_time:
+            break
+        iterations *= 10 if elapsed * 10 < min_round_time else 2
+    times: List[float] = list()
+    deadline = perf_counter() + max_time
+    while len(times) < min_rounds or perf_counter() < deadline:
+        start = perf_counter()
+        for _ in range(iterations):
+            func()
+        times.append((perf_counter() - start) / iterations)
+    return {"min": min(times), "max": max(times), "mean": mean(times), "median": median(times),
+            "stddev": stdev(times) if len(times) > 1 else 0.0, "rounds": len(times), "iterations": iterations,
+            "ops": 1 / mean(times)}
+
+
+def micro_benchmarks() -> Dict[str, Callable]:
+    from flask_app.server import Server
+    from flask_app.test_data_forms import form_validate_field_data
+    from flask_app.test_data_routes import _convert_field_data
+    benchmarks: Dict[str, Callable] = dict()
+    rng = Random(0)  # Same inputs on every run
+
+    def urandom(size: int) -> bytes:
+        # Random.randbytes needs Python 3.9
+        return rng.getrandbits(8 * size).to_bytes(size, "big")
+
+    for size in (4, 256, 4096):
+        benchmarks[f"_decode_data[{size}]"] = partial(Server._decode_data, b64encode(urandom(size)).decode())
+    regs = {reg: int.from_bytes(urandom(4), "big", signed=True) for reg in Config.REGISTERS}
+    benchmarks["_decode_regs[16]"] = partial(Server._decode_regs, regs)
+    for name, data in (("text", "'HELLO WORLD"), ("negative", "-12345"), ("number", "12345"), ("hex", "C1C2C3C4"),
+                       ("chars", "HELLO")):
+        benchmarks[f"form_validate_field_data[{name}]"] = partial(form_validate_field_data, data)
+    for count in (10, 100):
+        form_data = ",".join(f"WA0F{index:03}:{urandom(4).hex().upper()}" for index in range(count))
+        benchmarks[f"_convert_field_data[{count}]"] = partial(_convert_field_data, form_data)
+    return benchmarks
+
+
+def page_benchmarks(size: str, max_time: float, selected: Callable[[str], bool]) -> List[dict]:
+    from flask_app import tpf2_app
+    from flask_app.compression import Compression
+    from flask_app.server import CatalogCache, FieldCache, ConditionalCache
+    backend = StandInBackend(SIZES[size])
+    server, Config.SERVER_URL = serve_in_thread(backend)
+    tpf2_app.config["WTF_CSRF_ENABLED"] = False
+    client = tpf2_app.test_client()
+    owner = backend.headers[0]["owner"]
+    client.post("/login", data={"email": owner, "password": "stand-in"})
+    # Catalogs of the previous size are of a different backend
+    CatalogCache.invalidate("general")
+    FieldCache.clear()
+    ConditionalCache.clear()
+    results = list()
+    try:
+        for page, url in PAGES.items():
+            name = f"{page}[{size}]"
+            if not selected(name):
+                continue
+            url = url.format(test_data_id=backend.headers[0]["id"])
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+            # Size of the page as sent in each encoding the app compresses in
+            encoded_bytes = {encoding: len(client.get(url, headers={"Accept-Encoding": encoding}).data)
+                             for encoding in Compression.ENCODINGS}
+            stats = measure(partial(client.get, url), min_rounds=3, max_time=max_time)
+            results.append({"name": name, "group": page, "params": {"size": size, "url": url,
+                                                                      "bytes": len(response.data),
+                                                                      "encoded_bytes": encoded_bytes}, "stats": stats})
+            saved = " ".join(f"{encoding} -{1 - sent / len(response.data):.0%}" for encoding, sent in
+                             encoded_bytes.items())
+            print(f"{name:<40} {stats['median'] * 1000:>10.3f} ms {stats['rounds']:>6} rounds "
+                  f"{len(response.data):>10} bytes {saved}")
+    finally:
+        server.shutdown()
+    return results
+
+
+def compare(results: List[dict], baseline_path: str, threshold: float) -> bool:
+    with open(baseline_path) as baseline_file:
+        baseline = {benchmark["name"]: benchmark["stats"] for benchmark in json.load(baseline_file)["benchmarks"]}
+    print(f"\n{'Benchmark':<40} {'Baseline (ms)':>14} {'Current (ms)':>14} {'Ratio':>7}")
+    regressed = False
+    for benchmark in results:
+        if benchmark["name"] not in baseline:
+            continue
+        before, after = baseline[benchmark["name"]]["median"], benchmark["stats"]["median"]
+        flag = " SLOWER" if after / before > threshold else str()
+        regressed = regressed or bool(flag)
+        print(f"{benchmark['name']:<40} {before * 1000:>14.3f} {after * 1000:>14.3f} {after / before:>6.2f}x{flag}")
+    return not regressed
+
+
+def main():
+    parser = ArgumentParser(description="Page and decode benchmarks")
+    parser.add_argument("--output", help="Save the results as json to this file")
+    parser.add_argument("--compare", help="Compare the medians with the results saved in this file")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Fail if a median is slower by this factor")
+    parser.add_argument("--sizes", default=",".join(SIZES), help="Comma separated payload sizes of the page benchmarks")
+    parser.add_argument("--max-time", type=float, default=2.0, help="Seconds to spend on each benchmark")
+    parser.add_argument("-k", dest="keyword", default=str(), help="Only run benchmarks with this in their name")
+    args = parser.parse_args()
+
+    def selected(name: str) -> bool:
+        return args.keyword in name
+
+    results = list()
+    for name, func in micro_benchmarks().items():
+        if selected(name):
+            stats = measure(func, max_time=args.max_time)
+            results.append({"name": name, "group": name.split("[")[0], "params": dict(), "stats": stats})
+            print(f"{name:<40} {stats['median'] * 1e6:>10.3f} us {stats['rounds']:>6} rounds")
+    for size in args.sizes.split(","):
+        results.extend(page_benchmarks(size, args.max_time, selected))
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    report = {"machine_info": {"python": platform.python_version(), "platform": platform.platform(),
+                               "processor": platform.processor()},
+              "commit": commit, "datetime": datetime.now().isoformat(), "benchmarks": results}
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import json
+import subprocess
+import sys
+import tracemalloc
+from tempfile import NamedTemporaryFile
+
+from benchmarks.payloads import run_test_data_payload
+from flask_app.server import Server, LazyData
+
+# Memory of a decoded run of test data as nested dicts (what the app kept before the records) and as records. Retained
+# is what is held by the decoded test data for the rest of the request, blocks are the allocations still alive and peak
+# is the highest traced memory while parsing and decoding. Peak RSS is measured in a fresh process for each variant
+# (Linux only).
+#   python -m benchmarks.test_data_memory
+
+
+def _dict_hook(obj: dict) -> dict:
+    if isinstance(obj.get("data"), str) and ("field" in obj or "field_text" in obj):
+        obj["data"] = LazyData(obj["data"])
+    return obj
+
+
+def dicts(body: bytes) -> dict:
+    # The decode of run_test_data before the records, kept here as the baseline
+    test_data = json.loads(body, object_hook=_dict_hook)
+    test_data["regs"] = Server._decode_regs(test_data["regs"])
+    for core in test_data["cores"]:
+        core["hex_data"] = Server._decode_data(core["hex_data"])
+    for fixed_file in test_data["fixed_files"]:
+        fixed_file["rec_id"] = hex(fixed_file["rec_id"])[2:].upper()
+        for pool_file in fixed_file["pool_files"]:
+            pool_file["rec_id"] = hex(pool_file["rec_id"])[2:].upper()
+    for output in test_data["outputs"]:
+        output["regs"] = Server._decode_regs(output["regs"])
+    test_data["fields"] = [field_data["field"] for core in test_data["outputs"][0]["cores"]
+                           for field_data in core["field_data"]]
+    test_data["pnr_fields"] = [field_data["field_text"] for pnr_output in test_data["outputs"][0]["pnr_outputs"]
+                               for field_data in pnr_output["field_data"]]
+    test_data["stop_seg_string"] = ", ".join(test_data["stop_segments"])
+    return test_data
+
+
+def records(body: bytes):
+    return Server._decode_run_test_data(json.loads(body, object_hook=LazyData.json_hook))
+
+
+VARIANTS = {"dicts": dicts, "records": records}
+
+
+def measure(decode, body: bytes) -> tuple:
+    tracemalloc.start()
+    test_data = decode(body)
+    retained, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    del test_data
+    return retained, blocks, peak
+
+
+def _high_water_mark() -> int:
+    # Peak RSS in KB. ru_maxrss is not used since Linux carries it over from the parent that forked the process.
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+
+
+def peak_rss(variant: str, path: str) -> int:
+    # Growth of the peak RSS (in KB) of a fresh process that only reads the body and decodes it
+    code = ("import sys; from benchmarks.test_data_memory import VARIANTS, _high_water_mark; "
+            "body = open(sys.argv[2], 'rb').read(); before = _high_water_mark(); "
+            "test_data = VARIANTS[sys.argv[1]](body); print(_high_water_mark() - before)")
+    return int(subprocess.run([sys.executable, "-c", code, variant, path], capture_output=True, text=True,
+                              check=True).stdout)
+
+
+def main():
+    print(f"{'Variations':>10} {'Variant':>8} {'Retained (MB)':>14} {'Blocks':>10} {'Peak (MB)':>10} "
+          f"{'Peak RSS (MB)':>14}")
+    for variations in (10, 50, 200):
+        body = json.dumps(run_test_data_payload(variations=variations, cores=8, fields=40, length=16)).encode()
+        with NamedTemporaryFile(suffix=".json") as body_file:
+            body_file.write(body)
+            body_file.flush()
+            for variant, decode in VARIANTS.items():
+                retained, blocks, peak = measure(decode, body)
+                rss = peak_rss(variant, body_file.name)
+                print(f"{variations:>10} {variant:>8} {retained / 2 ** 20:>14.2f} {blocks:>10} {peak / 2 ** 20:>10.2f} "
+                      f"{rss / 2 ** 10:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,42 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY") or b64encode(os.urandom(24)).decode()
     SERVER_URL = os.environ.get("SERVER_URL") or f"http://{gethostbyname(gethostname())}:8000"
     CI_SECURITY = True if os.environ.get("ENVIRONMENT") == "prod" else False
-    DOWNLOAD_PATH = os.path.join(os.path.abspath(os.sep), "tmp")
+    LOCAL_BUCKET_PATH = os.environ.get("LOCAL_BUCKET_PATH")  # Directory standing in for cloud storage buckets
+    MANIFEST_BUCKET = os.environ.get("MANIFEST_BUCKET") or "tpf-manifests"  # Kept apart from the listings
+    UPLOAD_CHUNK_SIZE: int = 8 * 256 * 1024  # Resumable upload chunks have to be a multiple of 256 KB
+    UPLOAD_WORKERS: int = int(os.environ.get("UPLOAD_WORKERS") or 8)
+    UPLOAD_BATCH_SIZE: int = int(os.environ.get("UPLOAD_BATCH_SIZE") or 25)
+    BATCH_RETRY_SECONDS: int = int(os.environ.get("BATCH_RETRY_SECONDS") or 300)  # Retry of missing batch endpoints
     SESSION_COOKIE_SECURE = CI_SECURITY
     TOKEN_EXPIRY = 3600  # 1 hour = 3600 seconds
+    SERVER_POOL_SIZE: int = int(os.environ.get("SERVER_POOL_SIZE") or 8)  # Match gunicorn --threads
+    FAN_OUT_WORKERS: int = int(os.environ.get("FAN_OUT_WORKERS") or 4)  # Threads shared by the calls of Server.fan_out
+    SERVER_CONNECT_TIMEOUT: float = float(os.environ.get("SERVER_CONNECT_TIMEOUT") or 5)
+    SERVER_READ_TIMEOUT: float = float(os.environ.get("SERVER_READ_TIMEOUT") or 300)
+    ASYNC_POOL_SIZE: int = int(os.environ.get("ASYNC_POOL_SIZE") or 200)  # Backend connections of the async mode
+    ASYNC_THREADS: int = int(os.environ.get("ASYNC_THREADS") or 8)  # Threads that render pages in the async mode
+    STREAM_RUN_RESPONSE: bool = os.environ.get("STREAM_RUN_RESPONSE", "true").lower() != "false"
+    STREAM_CHUNK_SIZE: int = 64 * 1024
+    TEST_DATA_PAGE_SIZE: int = int(os.environ.get("TEST_DATA_PAGE_SIZE") or 50)
+    TEST_DATA_SORT_KEYS: tuple = ("name", "seg_name", "owner")
+    INSTRUCTION_PAGE_SIZE: int = int(os.environ.get("INSTRUCTION_PAGE_SIZE") or 500)
+    METRICS_ENABLED: bool = os.environ.get("METRICS_ENABLED", "true").lower() != "false"
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")  # Bearer token of /metrics, which is off in prod without it
+    SERVER_TIMING: bool = os.environ.get("SERVER_TIMING", "true").lower() != "false"
+    SERVER_TIMING_FOOTER: bool = os.environ.get("SERVER_TIMING_FOOTER", "false").lower() == "true"
+    COMPRESS_RESPONSES: bool = os.environ.get("COMPRESS_RESPONSES", "true").lower() != "false"
+    COMPRESS_MIN_SIZE: int = int(os.environ.get("COMPRESS_MIN_SIZE") or 1024)  # Smaller pages are sent as they are
+    COMPRESS_GZIP_LEVEL: int = int(os.environ.get("COMPRESS_GZIP_LEVEL") or 6)
+    COMPRESS_BROTLI_QUALITY: int = int(os.environ.get("COMPRESS_BROTLI_QUALITY") or 5)  # As fast as gzip level 6
+    FIELD_CACHE_SIZE: int = int(os.environ.get("FIELD_CACHE_SIZE") or 4096)
+    FIELD_CACHE_TTL: int = int(os.environ.get("FIELD_CACHE_TTL") or 3600)  # 1 hour = 3600 seconds
+    TEST_DATA_CACHE_SIZE: int = int(os.environ.get("TEST_DATA_CACHE_SIZE") or 256)
+    TEST_DATA_CACHE_TTL: int = int(os.environ.get("TEST_DATA_CACHE_TTL") or 300)  # 5 minutes, 0 disables the cache
+    CONDITIONAL_GET: bool = os.environ.get("CONDITIONAL_GET", "true").lower() != "false"
+    CONDITIONAL_CACHE_BYTES: int = int(os.environ.get("CONDITIONAL_CACHE_BYTES") or 64 * 1024 * 1024)
+    CONDITIONAL_CACHE_TTL: int = int(os.environ.get("CONDITIONAL_CACHE_TTL") or 3600)  # 1 hour = 3600 seconds
+    CATALOG_CACHE_BYTES: int = int(os.environ.get("CATALOG_CACHE_BYTES") or 32 * 1024 * 1024)  # Size of the bodies
+    CATALOG_CACHE_TTL: int = int(os.environ.get("CATALOG_CACHE_TTL") or 900)  # 15 minutes = 900 seconds
     REG_BITS: int = 32
     REG_MAX: int = (1 << REG_BITS) - 1  # 0xFFFFFFFF
     REGISTERS: tuple = ("R0", "R1", "R2", "R3", "R4", "R5", "R6", "R7", "R8", "R9", "R10", "R11", "R12", "R13", "R14",
@@ -1,10 +1,15 @@
 from flask import Flask
 from flask_login import LoginManager
+from flask_wtf import FlaskForm
 
 from config import Config
+from flask_app.csrf import MaskedCSRF
+from flask_app.metrics import TimedTemplate
 
 tpf2_app: Flask = Flask(__name__)
 tpf2_app.config.from_object(Config)
+tpf2_app.jinja_env.template_class = TimedTemplate
+FlaskForm.Meta.csrf_class = MaskedCSRF  # Pages are compressed, so the CSRF token is masked in every page
 login = LoginManager(tpf2_app)
 login.login_view = 'login'
 
@@ -0,0 +1,241 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from time import perf_counter
+from typing import Optional, Tuple, List, Dict, BinaryIO
+from urllib.parse import parse_qs
+
+import httpx
+from requests import Response, PreparedRequest
+from requests.structures import CaseInsensitiveDict
+from flask_login import login_user
+from werkzeug.http import parse_cookie
+
+from config import Config
+from flask_app import tpf2_app
+from flask_app.compression import Compression
+from flask_app.server import PrefetchedResponses, ConditionalCache, TestDataCache
+from flask_app.user import load_user
+
+# Optional async serving mode. The sync mode (flask_app:tpf2_app) stays the default.
+#   pip install -r requirements-async.txt
+#   gunicorn -k uvicorn.workers.UvicornWorker --workers 1 flask_app.asgi:asgi_app
+# The backend call of the pages that wait long on the backend (run, view test data and test results) is awaited on the
+# event loop with an async client, so one worker can hold hundreds of them in flight. The Flask app then runs on a
+# thread with the response already fetched and only holds the thread to decode and render. Every other request runs
+# on a thread as is. Flask's own async views would hold a thread for the whole backend call, hence this entry point.
+
+
+def backend_request(path: str, query_string: bytes) -> Optional[Tuple[str, Optional[dict]]]:
+    # The backend url and params that the page at path (GET) calls first, or None if the page is not prefetched
+    parts = path.strip("/").split("/")
+    if len(parts) == 3 and parts[0] == "test_data" and parts[2] == "run":
+        return path, None
+    if len(parts) == 2 and parts[0] == "test_data" and parts[1] != "create":
+        return path, None
+    if parts == ["test_results"]:
+        name = parse_qs(query_string.decode("latin-1")).get("name", [str()])[0]
+        return "/test_results", {"name": name} if name else None
+    return None
+
+
+class AsyncServer:
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        # One keep-alive client per worker. It is created on first use so that it belongs to the event loop of the
+        # worker. Like ServerSession, no cookies set by the backend are replayed.
+        if cls._client is None:
+            cls._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=Config.ASYNC_POOL_SIZE),
+                timeout=httpx.Timeout(Config.SERVER_READ_TIMEOUT, connect=Config.SERVER_CONNECT_TIMEOUT))
+        return cls._client
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    @classmethod
+    async def get(cls, url: str, params: Optional[dict], api_key: str,
+                  validators: Dict[str, str]) -> Tuple[Response, float, int]:
+        start = perf_counter()
+        response = await cls.get_client().get(f"{Config.SERVER_URL}{url}", params=params,
+                                              headers={"Authorization": f"Bearer {api_key}",
+                                                       "Accept-Encoding": Compression.ACCEPT_ENCODING, **validators})
+        seconds = perf_counter() - start
+        return cls._to_response(response), seconds, response.num_bytes_downloaded
+
+    @staticmethod
+    def _to_response(async_response: httpx.Response) -> Response:
+        # The rest of the app (and its metrics) reads requests responses. The body is read from raw like a streamed one.
+        # httpx has already decompressed it.
+        prepared = PreparedRequest()
+        prepared.prepare(method=async_response.request.method, url=str(async_response.request.url))
+        response = Response()
+        response.status_code = async_response.status_code
+        response.reason = async_response.reason_phrase
+        response.headers = CaseInsensitiveDict(async_response.headers)
+        response.headers.pop("Content-Encoding", None)
+        response.headers["Content-Length"] = str(len(async_response.content))
+        response.encoding = async_response.encoding
+        response.url = str(async_response.url)
+        response.request = prepared
+        response.raw = BytesIO(async_response.content)
+        return response
+
+
+class ReceiveStream:
+    # wsgi.input that reads the request body from the ASGI receive channel as the app asks for it, so that a large body
+    # (like a bulk upload of listings) is streamed to the app and never held whole. It is read from the thread that
+    # runs the app while the event loop waits for that thread.
+
+    def __init__(self, receive, loop: asyncio.AbstractEventLoop):
+        self._receive = receive
+        self._loop: asyncio.AbstractEventLoop = loop
+        self._buffer: bytearray = bytearray()
+        self._done: bool = False
+
+    def _fill(self) -> bool:
+        # Adds the next part of the body to the buffer. Returns False once the body (or the connection) has ended.
+        if self._done:
+            return False
+        message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+        self._buffer.extend(message.get("body", b""))
+        self._done = message["type"] == "http.disconnect" or not message.get("more_body")
+        return True
+
+    def _take(self, size: int) -> bytes:
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        size = -1 if size is None else size
+        while (size < 0 or len(self._buffer) < size) and self._fill():
+            pass
+        return self._take(len(self._buffer) if size < 0 else size)
+
+    def readline(self, size: Optional[int] = -1) -> bytes:
+        size = -1 if size is None else size
+        while b"\n" not in self._buffer and (size < 0 or len(self._buffer) < size) and self._fill():
+            pass
+        end = self._buffer.find(b"\n") + 1 or len(self._buffer)
+        return self._take(end if size < 0 else min(end, size))
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+
+class AsyncApp:
+    # ASGI application around the WSGI app. Requests are run on a pool of threads of their own (the pages are
+    # rendered synchronously) and their responses are sent once complete.
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=Config.ASYNC_THREADS, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope: dict, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] == "websocket":
+            # No page uses websockets, so the connection is closed cleanly instead of failing the worker
+            await receive()
+            await send({"type": "websocket.close", "code": 1000})
+            return
+        if scope["type"] != "http":
+            return
+        environ = self.build_environ(scope, ReceiveStream(receive, asyncio.get_running_loop()))
+        if scope["method"] == "GET":
+            await self.prefetch(scope, environ)
+        status, headers, response_body = await asyncio.get_running_loop().run_in_executor(self.executor,
+                                                                                           self.run_wsgi, environ)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": response_body})
+
+    async def lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await AsyncServer.close()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def prefetch(scope: dict, environ: dict) -> None:
+        request = backend_request(scope["path"], scope["query_string"])
+        user_data = parse_cookie(environ).get("user_data")
+        user = load_user(user_data) if request and user_data else None
+        if not user:
+            return
+        url, params = request
+        # The caches are read in the context of the request (its session and user) just like the page would read them
+        with tpf2_app.request_context(dict(environ)):
+            login_user(user)
+            parts = url.strip("/").split("/")
+            if len(parts) == 2 and parts[0] == "test_data" and TestDataCache.contains(parts[1]):
+                return  # The page is served from the cache without any backend call
+            cached = ConditionalCache.get(url, params)
+        validators = ConditionalCache.validators(cached) if cached is not None else dict()
+        try:
+            response, seconds, response_bytes = await AsyncServer.get(url, params, user.api_key, validators)
+        except httpx.HTTPError:
+            return  # The page sends the request again and handles the error just like in the sync mode
+        environ[PrefetchedResponses.ENVIRON_KEY] = {
+            PrefetchedResponses.key("GET", url, params): (response, seconds, response_bytes, cached)}
+
+    @staticmethod
+    def build_environ(scope: dict, body: BinaryIO) -> dict:
+        server = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", str()).encode().decode("latin-1"),
+            "PATH_INFO": scope["path"].encode().decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+            "REMOTE_ADDR": scope["client"][0] if scope.get("client") else str(),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.input_terminated": True,  # The body ends where the stream ends, even without a Content-Length
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            name, value = name.decode("latin-1"), value.decode("latin-1")
+            key = name.upper().replace("-", "_")
+            key = key if key in ("CONTENT_LENGTH", "CONTENT_TYPE") else f"HTTP_{key}"
+            separator = "; " if key == "HTTP_COOKIE" else ","
+            environ[key] = f"{environ[key]}{separator}{value}" if key in environ else value
+        return environ
+
+    def run_wsgi(self, environ: dict) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+        response: dict = dict()
+        chunks: List[bytes] = list()
+
+        def start_response(status: str, headers: list, exc_info=None):
+            response["status"] = int(status.split(" ")[0])
+            response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+            return chunks.append
+
+        iterable = self.wsgi_app(environ, start_response)
+        try:
+            chunks.extend(iterable)
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+        return response["status"], response["headers"], b"".join(chunks)
+
+
+asgi_app = AsyncApp(tpf2_app)
@@ -0,0 +1,52 @@
+import gzip
+from time import perf_counter
+from typing import Optional, Tuple
+
+from flask import Request, Response
+
+from config import Config
+from flask_app.metrics import Metrics, RequestTimer
+
+try:
+    import brotli
+except ImportError:  # Pages are only gzipped without it
+    brotli = None
+
+
+class Compression:
+    # Content negotiation of compressed bodies on both legs. Pages (test data, run and result views run into thousands
+    # of lines of repetitive html) are compressed after they are rendered, in the best encoding the browser accepts.
+    # Backend responses are asked for in the same encodings and decompressed by requests / httpx.
+    ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli else ("gzip",)
+    ACCEPT_ENCODING: str = ", ".join(ENCODINGS)  # Accept-Encoding sent to the backend
+    MIMETYPES = frozenset({"text/html", "text/plain", "application/json"})
+
+    @classmethod
+    def encoding(cls, request: Request) -> Optional[str]:
+        return request.accept_encodings.best_match(cls.ENCODINGS)
+
+    @staticmethod
+    def compress(data: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(data, quality=Config.COMPRESS_BROTLI_QUALITY)
+        return gzip.compress(data, compresslevel=Config.COMPRESS_GZIP_LEVEL)
+
+    @classmethod
+    def compress_response(cls, request: Request, response: Response) -> Response:
+        # Files and streamed responses are sent as they are
+        if not Config.COMPRESS_RESPONSES or response.mimetype not in cls.MIMETYPES or response.direct_passthrough \
+                or response.is_streamed or "Content-Encoding" in response.headers:
+            return response
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        encoding = cls.encoding(request) if response.status_code == 200 else None
+        if not encoding or len(data) < Config.COMPRESS_MIN_SIZE:
+            Metrics.observe_page_bytes(request.endpoint, "identity", len(data), len(data))
+            return response
+        start = perf_counter()
+        compressed = cls.compress(data, encoding)
+        RequestTimer.add("compress", perf_counter() - start)
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        Metrics.observe_page_bytes(request.endpoint, encoding, len(data), len(compressed))
+        return response
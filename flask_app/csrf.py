@@ -0,0 +1,45 @@
+import os
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from binascii import Error as Base64Error
+
+from flask import g
+from flask_wtf.csrf import generate_csrf, validate_csrf
+from wtforms import ValidationError
+from wtforms.csrf.core import CSRF
+
+
+class MaskedCSRF(CSRF):
+    # CSRF of every form (see flask_app/__init__.py) with the token masked by a new random pad each time it is rendered.
+    # The token of Flask-WTF stays the same for the whole session, so a compressed page that also reflects user input
+    # (like a search) would give it away through the size of the page (BREACH). The masked token is
+    # base64(pad + token XOR pad) and is unmasked before it is validated by Flask-WTF as usual.
+
+    def setup_form(self, form):
+        self.meta = form.meta
+        return super().setup_form(form)
+
+    @staticmethod
+    def mask(token: str) -> str:
+        data = token.encode()
+        pad = os.urandom(len(data))
+        return urlsafe_b64encode(pad + bytes(byte ^ pad_byte for byte, pad_byte in zip(data, pad))).decode()
+
+    @staticmethod
+    def unmask(masked_token: str) -> str:
+        try:
+            data = urlsafe_b64decode(masked_token.encode())
+        except (Base64Error, ValueError):
+            raise ValidationError("The CSRF token is invalid.")
+        if not data or len(data) % 2:
+            raise ValidationError("The CSRF token is invalid.")
+        size = len(data) // 2
+        return bytes(byte ^ pad_byte for byte, pad_byte in zip(data[size:], data[:size])).decode("latin-1")
+
+    def generate_csrf_token(self, csrf_token_field) -> str:
+        return self.mask(generate_csrf(secret_key=self.meta.csrf_secret, token_key=self.meta.csrf_field_name))
+
+    def validate_csrf_token(self, form, field) -> None:
+        if g.get("csrf_valid", False):
+            return
+        validate_csrf(self.unmask(field.data) if field.data else field.data, self.meta.csrf_secret,
+                      self.meta.csrf_time_limit, self.meta.csrf_field_name)
@@ -1,12 +1,23 @@
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from hashlib import sha256
+from io import BytesIO
+from shutil import copyfileobj
+from threading import Lock
+from time import perf_counter
 from types import SimpleNamespace
+from typing import BinaryIO, Callable, List, Optional, Dict, Tuple
+from zipfile import ZipFile, BadZipFile
 
+from flask import current_app
 from flask_login import current_user
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileAllowed
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
-from wtforms import FileField, SubmitField, ValidationError
+from wtforms import FileField, SubmitField, ValidationError, MultipleFileField, BooleanField
 
 from config import Config
 from flask_app.server import Server
@@ -33,14 +44,196 @@ class Bucket:
         return cls.BUCKETS.GENERAL
 
 
+class HashingReader:
+    # Hashes a stream while it is read by an upload so that it is read only once. An upload may seek back to send a
+    # chunk again, so only the bytes after the ones already hashed are added.
+
+    def __init__(self, stream: BinaryIO):
+        self.stream: BinaryIO = stream
+        self._hash = sha256()
+        self._hashed: int = 0
+
+    def read(self, size: int = -1) -> bytes:
+        position = self.stream.tell()
+        data = self.stream.read(size)
+        if position <= self._hashed < position + len(data):
+            self._hash.update(memoryview(data)[self._hashed - position:])
+            self._hashed = position + len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self.stream.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.stream.tell()
+
+    def hexdigest(self) -> str:
+        # Hashes whatever the upload did not read (or skipped) before returning the hash of the whole stream
+        self.stream.seek(self._hashed)
+        for _ in iter(partial(self.read, Config.UPLOAD_CHUNK_SIZE), b""):
+            pass
+        return self._hash.hexdigest()
+
+
+class ListingStorage:
+    # Streams listings into the bucket of the domain. One storage client is created per worker and shared by all its
+    # threads. If LOCAL_BUCKET_PATH is set then each bucket is a directory under it instead.
+    _client = None
+    _executor: Optional[ThreadPoolExecutor] = None
+    _lock: Lock = Lock()
+
+    @classmethod
+    def _get_client(cls):
+        with cls._lock:
+            if cls._client is None:
+                # noinspection PyPackageRequirements
+                from google.cloud.storage import Client
+                cls._client = Client()
+        return cls._client
+
+    @classmethod
+    def upload(cls, stream: BinaryIO, bucket_name: str, blob_name: str, content_type: str = "text/plain") -> None:
+        if Config.LOCAL_BUCKET_PATH:
+            cls._upload_local(stream, bucket_name, blob_name)
+            return
+        blob = cls._get_client().bucket(bucket_name).blob(blob_name, chunk_size=Config.UPLOAD_CHUNK_SIZE)
+        blob.upload_from_file(stream, content_type=content_type)
+
+    @classmethod
+    def download(cls, bucket_name: str, blob_name: str) -> Optional[bytes]:
+        if Config.LOCAL_BUCKET_PATH:
+            file_path = os.path.join(Config.LOCAL_BUCKET_PATH, bucket_name, blob_name)
+            if not os.path.exists(file_path):
+                return None
+            with open(file_path, "rb") as file:
+                return file.read()
+        blob = cls._get_client().bucket(bucket_name).get_blob(blob_name)
+        return blob.download_as_bytes() if blob else None
+
+    @staticmethod
+    def errors() -> tuple:
+        # Errors of a bucket that is missing or not accessible. The google client is only imported once it is used.
+        if Config.LOCAL_BUCKET_PATH:
+            return (OSError,)
+        # noinspection PyPackageRequirements
+        from google.api_core.exceptions import GoogleAPIError
+        return GoogleAPIError, OSError
+
+    @staticmethod
+    def content_hash(stream: BinaryIO) -> str:
+        # Reads the stream once in chunks and rewinds it so that it can be uploaded after
+        content_hash = sha256()
+        for chunk in iter(partial(stream.read, Config.UPLOAD_CHUNK_SIZE), b""):
+            content_hash.update(chunk)
+        stream.seek(0)
+        return content_hash.hexdigest()
+
+    @classmethod
+    def upload_changed(cls, stream: BinaryIO, bucket_name: str, blob_name: str, size: int,
+                       known: Optional[dict]) -> Tuple[str, bool]:
+        # Uploads the stream unless it matches the manifest entry known for it. Returns the content hash and whether it
+        # was uploaded. A listing whose size differs has changed for sure, so it is hashed while it is uploaded. Only
+        # one of the same size is read before to compare its hash.
+        if known and known.get("size") == size:
+            content_hash = cls.content_hash(stream)
+            if content_hash == known.get("hash"):
+                return content_hash, False
+            cls.upload(stream, bucket_name, blob_name)
+            return content_hash, True
+        reader = HashingReader(stream)
+        cls.upload(reader, bucket_name, blob_name)
+        return reader.hexdigest(), True
+
+    @classmethod
+    def upload_all(cls, listings: List[dict], bucket_name: str, manifest: Dict[str, dict]) -> None:
+        # Uploads in parallel with at most UPLOAD_WORKERS transfers in flight across all requests of the worker. Each
+        # listing has a filename, a size and an opener returning its stream. Listings that match the manifest are not
+        # uploaded again. The status and content hash of each listing are updated in place.
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=Config.UPLOAD_WORKERS, thread_name_prefix="upload")
+        futures = [cls._executor.submit(cls._upload_opened, listing["opener"], bucket_name, listing["filename"],
+                                        listing["size"], manifest.get(listing["filename"])) for listing in listings]
+        for listing, future in zip(listings, futures):
+            error = future.exception()
+            if error:
+                listing["status"], listing["message"] = "failed", str(error)
+                continue
+            listing["content_hash"], uploaded = future.result()
+            listing["status"] = "uploaded" if uploaded else "unchanged"
+
+    @classmethod
+    def _upload_opened(cls, opener: Callable[[], BinaryIO], bucket_name: str, blob_name: str, size: int,
+                       known: Optional[dict]) -> Tuple[str, bool]:
+        with opener() as stream:
+            return cls.upload_changed(stream, bucket_name, blob_name, size, known)
+
+    @staticmethod
+    def _upload_local(stream: BinaryIO, bucket_name: str, blob_name: str) -> None:
+        bucket_path = os.path.join(Config.LOCAL_BUCKET_PATH, bucket_name)
+        os.makedirs(bucket_path, exist_ok=True)
+        file_path = os.path.join(bucket_path, blob_name)
+        # Written under a temporary name so that a reader never sees a partial listing
+        with open(f"{file_path}.part", "wb") as file:
+            copyfileobj(stream, file, Config.UPLOAD_CHUNK_SIZE)
+        os.replace(f"{file_path}.part", file_path)
+
+
+class ListingManifest:
+    # Content hash and size of every listing that was uploaded and assembled successfully, e.g.
+    # {"abcd.lst": {"hash": "<sha256>", "size": 1024}}. It is kept as a json blob in MANIFEST_BUCKET and not with the
+    # listings, since the backend assembles whatever is in the bucket of the listings. There is one blob per listings
+    # bucket and domain since domains sharing a bucket assemble their segments separately.
+    _lock: Lock = Lock()
+
+    @staticmethod
+    def _blob_name(bucket_name: str, domain: str) -> str:
+        return f"{bucket_name}.{domain}.json"
+
+    @staticmethod
+    def entry(content_hash: str, size: int) -> dict:
+        return {"hash": content_hash, "size": size}
+
+    @classmethod
+    def load(cls, bucket_name: str, domain: str) -> Dict[str, dict]:
+        # A manifest that cannot be read is taken as no manifest, so every listing is uploaded
+        try:
+            manifest = ListingStorage.download(Config.MANIFEST_BUCKET, cls._blob_name(bucket_name, domain))
+        except ListingStorage.errors() as error:
+            current_app.logger.warning(f"Listing manifest of {bucket_name} not read from {Config.MANIFEST_BUCKET}: "
+                                       f"{error}")
+            return dict()
+        return json.loads(manifest) if manifest else dict()
+
+    @classmethod
+    def update(cls, bucket_name: str, domain: str, entries: Dict[str, dict]) -> None:
+        if not entries:
+            return
+        with cls._lock:
+            manifest = cls.load(bucket_name, domain)
+            manifest.update(entries)
+            # The listings are already assembled by then, so a manifest that cannot be written only means that they
+            # are uploaded again the next time
+            try:
+                ListingStorage.upload(BytesIO(json.dumps(manifest).encode()), Config.MANIFEST_BUCKET,
+                                      cls._blob_name(bucket_name, domain), content_type="application/json")
+            except ListingStorage.errors() as error:
+                current_app.logger.warning(f"Listing manifest of {bucket_name} not written to "
+                                           f"{Config.MANIFEST_BUCKET}: {error}")
+
+
 class UploadForm(FlaskForm):
     listing = FileField("Choose file only with asm or lst extension", validators=[FileAllowed(["lst", "asm"])])
+    force = BooleanField("Upload and assemble again even if unchanged")
     submit = SubmitField("Upload")
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.blob_name = str()
         self.seg_name = str()
+        self.content_hash = str()
+        self.size = 0
+        self.unchanged = False
 
     def validate_listing(self, listing: FileField):
         file_storage: FileStorage = listing.data
@@ -53,10 +246,92 @@ class UploadForm(FlaskForm):
         self.seg_name = filename[:4].upper()
         if self.seg_name in response["attributes"] and response["attributes"][self.seg_name]["source"] == "local":
             raise ValidationError("Cannot upload segments which are present in local")
-        file_path = os.path.join(Config.DOWNLOAD_PATH, filename)
-        file_storage.save(file_path)
-        # noinspection PyPackageRequirements
-        from google.cloud.storage import Client
-        blob = Client().bucket(Bucket.get_bucket()).blob(filename)
-        blob.upload_from_filename(file_path)
+        file_storage.stream.seek(0, os.SEEK_END)
+        self.size = file_storage.stream.tell()
+        file_storage.stream.seek(0)
+        known = ListingManifest.load(Bucket.get_bucket(), current_user.domain).get(filename) \
+            if not self.force.data else None
+        self.content_hash, uploaded = ListingStorage.upload_changed(file_storage.stream, Bucket.get_bucket(), filename,
+                                                                    self.size, known)
+        self.unchanged = not uploaded
         self.blob_name = filename
+
+    def update_manifest(self, response: dict) -> None:
+        if response and not response.get("error"):
+            ListingManifest.update(Bucket.get_bucket(), current_user.domain,
+                                   {self.blob_name: ListingManifest.entry(self.content_hash, self.size)})
+
+
+class BulkUploadForm(FlaskForm):
+    listings = MultipleFileField("Choose files only with asm or lst extension")
+    archive = FileField("OR choose a zip archive of asm or lst files", validators=[FileAllowed(["zip"])])
+    force = BooleanField("Upload and assemble again even if unchanged")
+    submit = SubmitField("Upload")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.blob_names: List[str] = list()
+        self.uploads: List[dict] = list()
+        self.total_size: int = 0
+        self.transfer_seconds: float = 0.0
+
+    def validate_listings(self, listings: MultipleFileField):
+        file_storages: List[FileStorage] = [file_storage for file_storage in listings.data or list()
+                                            if file_storage and file_storage.filename]
+        archive: FileStorage = self.archive.data
+        if not file_storages and not archive:
+            raise ValidationError("No file selected for upload")
+        for file_storage in file_storages:
+            file_storage.stream.seek(0, os.SEEK_END)
+            size = file_storage.stream.tell()
+            file_storage.stream.seek(0)
+            self._add_upload(file_storage.filename, size, partial(lambda stream: stream, file_storage.stream))
+        if archive:
+            try:
+                zip_file = ZipFile(archive.stream)
+            except BadZipFile:
+                raise ValidationError("The archive is not a valid zip file")
+            for info in zip_file.infolist():
+                if not info.is_dir():
+                    self._add_upload(os.path.basename(info.filename), info.file_size, partial(zip_file.open, info))
+        response = Server.segments()
+        if not current_user.is_authenticated:
+            raise ValidationError("Session expired")
+        accepted = list()
+        for upload in self.uploads:
+            if upload["status"]:
+                continue
+            if upload["seg_name"] in response["attributes"] and \
+                    response["attributes"][upload["seg_name"]]["source"] == "local":
+                upload["status"], upload["message"] = "rejected", "Cannot upload segments which are present in local"
+                continue
+            accepted.append(upload)
+        manifest = ListingManifest.load(Bucket.get_bucket(), current_user.domain) if not self.force.data else dict()
+        start = perf_counter()
+        ListingStorage.upload_all(accepted, Bucket.get_bucket(), manifest)
+        self.transfer_seconds = perf_counter() - start
+        self.blob_names = [upload["filename"] for upload in accepted if upload["status"] == "uploaded"]
+        self.total_size = sum(upload["size"] for upload in accepted if upload["status"] == "uploaded")
+        if not self.blob_names and not any(upload["status"] == "unchanged" for upload in accepted):
+            raise ValidationError("None of the files were uploaded")
+
+    def _add_upload(self, name: str, size: int, opener: Callable[[], BinaryIO]) -> None:
+        filename = secure_filename(name).lower()
+        upload = {"filename": filename or name, "seg_name": filename[:4].upper(), "size": size, "opener": opener,
+                  "status": str(), "message": str(), "content_hash": str()}
+        if os.path.splitext(filename)[1] not in (".lst", ".asm"):
+            upload["status"], upload["message"] = "rejected", "Only files with asm or lst extension are allowed"
+        elif any(other["filename"] == filename for other in self.uploads):
+            upload["status"], upload["message"] = "rejected", "Duplicate file name"
+        self.uploads.append(upload)
+
+    def update_manifest(self, responses: Dict[str, dict]) -> None:
+        entries = {upload["filename"]: ListingManifest.entry(upload["content_hash"], upload["size"])
+                   for upload in self.uploads if upload["status"] == "uploaded" and responses.get(upload["filename"])
+                   and not responses[upload["filename"]].get("error")}
+        ListingManifest.update(Bucket.get_bucket(), current_user.domain, entries)
+
+    @property
+    def throughput(self) -> float:
+        # Megabytes per second transferred to the bucket
+        return self.total_size / self.transfer_seconds / 2 ** 20 if self.transfer_seconds else 0.0
@@ -0,0 +1,109 @@
+import codecs
+from json import JSONDecoder, JSONDecodeError
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+WHITESPACE = " \t\n\r"
+NUMBER = "0123456789+-.eE"
+
+
+class JsonStream:
+    # Parses a json object from a body that is read in chunks, e.g. JsonStream(response.iter_content(64 * 1024)).
+    # The items of the arrays named in item_hooks are passed to their hook as soon as each one is parsed, so only the
+    # raw text of a single item (and of the chunk after it) is held at a time instead of the whole body. Every other
+    # value is parsed whole. The json module has no incremental parser, so each value is parsed with raw_decode once
+    # its text has been read: a value that is not complete yet fails and is parsed again after more is read. The text
+    # read is doubled every time, so a value is parsed at most a few times.
+
+    def __init__(self, chunks: Iterable[bytes], encoding: str = "utf-8", object_hook: Optional[Callable] = None):
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._json: JSONDecoder = JSONDecoder(object_hook=object_hook)
+        self._buffer: str = str()
+        self._position: int = 0
+        self._ended: bool = False
+
+    def _read(self) -> bool:
+        # Appends the next chunk to the buffer and drops the text already parsed. False at the end of the body.
+        if self._ended:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._ended = True
+            text = self._decoder.decode(b"", final=True)
+        else:
+            text = self._decoder.decode(chunk)
+        self._buffer = self._buffer[self._position:] + text
+        self._position = 0
+        return True
+
+    def _peek(self) -> str:
+        # The next character after any whitespace without consuming it. Empty at the end of the body.
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in WHITESPACE:
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                return str()
+
+    def _expect(self, characters: str) -> str:
+        character = self._peek()
+        if not character or character not in characters:
+            raise JSONDecodeError(f"Expecting one of {characters!r}", self._buffer, self._position)
+        self._position += 1
+        return character
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._position)
+            except JSONDecodeError:
+                if not self._read_more():
+                    raise
+                continue
+            # A number is only complete once it is followed by a character that cannot be part of it
+            if not self._buffer[end - 1].isdigit() or (end < len(self._buffer) and self._buffer[end] not in NUMBER) \
+                    or not self._read():
+                self._position = end
+                return value
+
+    def _read_more(self) -> bool:
+        # Reads until the text after the position is twice as long or the body ends. False if nothing more was read.
+        target = 2 * (len(self._buffer) - self._position)
+        read = False
+        while len(self._buffer) - self._position < target or not read:
+            if not self._read():
+                return read
+            read = True
+        return read
+
+    def _array(self, hook: Callable) -> list:
+        self._expect("[")
+        items = list()
+        if self._peek() == "]":
+            self._position += 1
+            return items
+        while True:
+            items.append(hook(self._value()))
+            if self._expect(",]") == "]":
+                return items
+
+    def load(self, item_hooks: Dict[str, Callable]) -> dict:
+        self._expect("{")
+        values = dict()
+        if self._peek() == "}":
+            self._position += 1
+        else:
+            while True:
+                key = self._value()
+                if not isinstance(key, str):
+                    raise JSONDecodeError("Expecting property name", self._buffer, self._position)
+                self._expect(":")
+                values[key] = self._array(item_hooks[key]) if key in item_hooks and self._peek() == "[" \
+                    else self._value()
+                if self._expect(",}") == "}":
+                    break
+        if self._peek():
+            raise JSONDecodeError("Extra data", self._buffer, self._position)
+        return values
@@ -0,0 +1,247 @@
+from bisect import bisect_left
+from functools import wraps, lru_cache
+from threading import Lock, local
+from time import perf_counter
+from typing import Dict, List, Tuple, Callable
+
+from flask import request, has_request_context
+from jinja2 import Template
+
+from config import Config
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+                                      300.0)
+SIZE_BUCKETS: Tuple[float, ...] = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS: Tuple[float, ...] = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+# Path segments of the backend API that are not parameters. Everything else is replaced by {} in the endpoint label.
+ENDPOINT_WORDS = frozenset({
+    "aaa", "add", "batch", "comment", "copy", "core", "cores", "create", "debug", "delete", "ecb_level", "fields",
+    "fixed_files", "global", "heap", "input", "instructions", "macro", "macros", "name", "output", "pnr", "regs",
+    "rename", "run", "save_results", "segments", "symbol_table", "templates", "test_data", "test_results", "tokens",
+    "tpfdf", "types", "unsupported_instructions", "update", "upload", "variations",
+})
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Histogram:
+    # Cumulative histogram per combination of label values in the Prometheus text format. Each series holds the count
+    # of every bucket (the last one being +Inf) followed by the sum of the observed values.
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name: str = name
+        self.documentation: str = documentation
+        self.label_names: Tuple[str, ...] = label_names
+        self.buckets: Tuple[float, ...] = buckets
+        self._series: Dict[tuple, list] = dict()
+        self._lock: Lock = Lock()
+
+    def observe(self, label_values: tuple, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_list = [(label_values, list(series)) for label_values, series in self._series.items()]
+        for label_values, series in sorted(series_list):
+            labels = ",".join(f"{name}=\"{_escape(value)}\"" for name, value in zip(self.label_names, label_values))
+            prefix = f"{labels}," if labels else str()
+            cumulative = 0
+            for bucket, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bucket == float("inf") else f"{bucket:g}"
+                lines.append(f"{self.name}_bucket{{{prefix}le=\"{le}\"}} {cumulative}")
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Stats:
+    # Gauges of a stats function (like the ones of the caches) that are read each time the metrics are rendered. Every
+    # key of the returned dict is rendered as its own gauge, e.g. tpf2_catalog_cache_hits.
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Dict[str, int]]):
+        self.name: str = name
+        self.documentation: str = documentation
+        self.collect: Callable[[], Dict[str, int]] = collect
+
+    def render(self) -> List[str]:
+        lines = list()
+        for key, value in self.collect().items():
+            lines.append(f"# HELP {self.name}_{key} {self.documentation} ({key.replace('_', ' ')})")
+            lines.append(f"# TYPE {self.name}_{key} gauge")
+            lines.append(f"{self.name}_{key} {value}")
+        return lines
+
+
+class RequestTimer:
+    # Time and number of calls of each kind of work (backend, decode) done for the current request. It is kept in the
+    # WSGI environ so that calls fanned out to other threads, which get a copy of the request context, add to it too.
+    _lock: Lock = Lock()
+    ENVIRON_KEY = "tpf2.timings"
+
+    @classmethod
+    def add(cls, name: str, seconds: float) -> None:
+        if not has_request_context():
+            return
+        with cls._lock:
+            timing = request.environ.setdefault(cls.ENVIRON_KEY, dict()).setdefault(name, [0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+
+    @classmethod
+    def get(cls) -> Dict[str, list]:
+        if not has_request_context():
+            return dict()
+        with cls._lock:
+            return {name: list(timing) for name, timing in request.environ.get(cls.ENVIRON_KEY, dict()).items()}
+
+    @classmethod
+    def start(cls) -> None:
+        request.environ[f"{cls.ENVIRON_KEY}.start"] = perf_counter()
+
+    @classmethod
+    def server_timing(cls) -> str:
+        # Value of the Server-Timing header, e.g. backend;dur=120.5;desc="3 calls", decode;dur=2.1, total;dur=140.2
+        metrics = [f"{name};dur={seconds * 1000:.1f};desc=\"{count} calls\"" if name == "backend" else
+                   f"{name};dur={seconds * 1000:.1f}" for name, (count, seconds) in cls.get().items()]
+        start = request.environ.get(f"{cls.ENVIRON_KEY}.start")
+        if start is not None:
+            metrics.append(f"total;dur={(perf_counter() - start) * 1000:.1f}")
+        return ", ".join(metrics)
+
+    @classmethod
+    def summary(cls) -> str:
+        # Time spent till now for the debug footer of the page
+        return ", ".join(f"{name} {seconds * 1000:.1f} ms ({count} calls)" for name, (count, seconds) in
+                         cls.get().items())
+
+
+class TimedTemplate(Template):
+    # Adds the time of every top level render to the render time of the request. Included and extended templates are
+    # rendered as part of their parent so they are not counted twice.
+
+    def render(self, *args, **kwargs) -> str:
+        start = perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            RequestTimer.add("render", perf_counter() - start)
+
+
+class Metrics:
+    BACKEND_SECONDS = Histogram("tpf2_backend_request_seconds", "Latency of backend calls till the response headers.",
+                                ("method", "endpoint", "status"), LATENCY_BUCKETS)
+    BACKEND_REQUEST_BYTES = Histogram("tpf2_backend_request_bytes", "Size of the body sent to the backend.",
+                                      ("method", "endpoint"), SIZE_BUCKETS)
+    BACKEND_RESPONSE_BYTES = Histogram("tpf2_backend_response_bytes", "Size of the body received from the backend.",
+                                       ("method", "endpoint"), SIZE_BUCKETS)
+    BACKEND_DECODED_BYTES = Histogram("tpf2_backend_decoded_bytes",
+                                      "Size of the body received from the backend after it is decompressed.",
+                                      ("method", "endpoint"), SIZE_BUCKETS)
+    BACKEND_PARSE_SECONDS = Histogram("tpf2_backend_parse_seconds", "Time to read and parse backend json responses.",
+                                      ("method", "endpoint"), LATENCY_BUCKETS)
+    DECODE_SECONDS = Histogram("tpf2_decode_seconds", "Time to decode test data received from the backend.",
+                               ("function",), LATENCY_BUCKETS)
+    PAGE_BACKEND_CALLS = Histogram("tpf2_page_backend_calls", "Number of backend calls made to serve a page.",
+                                   ("endpoint",), COUNT_BUCKETS)
+    PAGE_BACKEND_SECONDS = Histogram("tpf2_page_backend_seconds", "Total backend time spent to serve a page.",
+                                     ("endpoint",), LATENCY_BUCKETS)
+    PAGE_BYTES = Histogram("tpf2_page_bytes", "Size of the page before it is compressed.", ("endpoint", "encoding"),
+                           SIZE_BUCKETS)
+    PAGE_SENT_BYTES = Histogram("tpf2_page_sent_bytes", "Size of the page as sent.", ("endpoint", "encoding"),
+                                SIZE_BUCKETS)
+    ALL: Tuple[Histogram, ...] = (BACKEND_SECONDS, BACKEND_REQUEST_BYTES, BACKEND_RESPONSE_BYTES, BACKEND_DECODED_BYTES,
+                                  BACKEND_PARSE_SECONDS, DECODE_SECONDS, PAGE_BACKEND_CALLS, PAGE_BACKEND_SECONDS,
+                                  PAGE_BYTES, PAGE_SENT_BYTES)
+    STATS: List[Stats] = list()
+    _decode_depth = local()
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _path_template(path: str) -> str:
+        return "/".join(word if not word or word in ENDPOINT_WORDS else "{}" for word in path.split("/"))
+
+    @classmethod
+    def endpoint(cls, url: str) -> str:
+        # /test_data/1234/input/heap/HEAP1/variations/0 -> /test_data/{}/input/heap/{}/variations/{}
+        return cls._path_template(url.split("?")[0])
+
+    @classmethod
+    def observe_backend(cls, method: str, url: str, status: int, seconds: float, request_bytes: int,
+                        response_bytes: int, decoded_bytes: int) -> None:
+        # response_bytes are as received (compressed if the backend did) and -1 when not known, like decoded_bytes
+        RequestTimer.add("backend", seconds)
+        if not Config.METRICS_ENABLED:
+            return
+        endpoint = cls.endpoint(url)
+        cls.BACKEND_SECONDS.observe((method, endpoint, str(status)), seconds)
+        cls.BACKEND_REQUEST_BYTES.observe((method, endpoint), request_bytes)
+        if response_bytes >= 0:
+            cls.BACKEND_RESPONSE_BYTES.observe((method, endpoint), response_bytes)
+        if decoded_bytes >= 0:
+            cls.BACKEND_DECODED_BYTES.observe((method, endpoint), decoded_bytes)
+
+    @classmethod
+    def observe_parse(cls, method: str, url: str, seconds: float) -> None:
+        if Config.METRICS_ENABLED:
+            cls.BACKEND_PARSE_SECONDS.observe((method, cls.endpoint(url)), seconds)
+
+    @classmethod
+    def observe_page(cls, endpoint: str) -> None:
+        if not Config.METRICS_ENABLED or not endpoint:
+            return
+        calls, seconds = RequestTimer.get().get("backend", (0, 0.0))
+        cls.PAGE_BACKEND_CALLS.observe((endpoint,), calls)
+        cls.PAGE_BACKEND_SECONDS.observe((endpoint,), seconds)
+
+    @classmethod
+    def observe_page_bytes(cls, endpoint: str, encoding: str, page_bytes: int, sent_bytes: int) -> None:
+        # The bytes saved by compression of each page are the difference of the sums of the two histograms
+        if not Config.METRICS_ENABLED or not endpoint:
+            return
+        cls.PAGE_BYTES.observe((endpoint, encoding), page_bytes)
+        cls.PAGE_SENT_BYTES.observe((endpoint, encoding), sent_bytes)
+
+    @classmethod
+    def timed_decode(cls, func: Callable) -> Callable:
+        # Only the outermost decode adds to the decode time of the request since decode functions call each other
+        @wraps(func)
+        def decode_wrapper(*args, **kwargs):
+            depth = getattr(cls._decode_depth, "value", 0)
+            cls._decode_depth.value = depth + 1
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds = perf_counter() - start
+                cls._decode_depth.value = depth
+                if depth == 0:
+                    RequestTimer.add("decode", seconds)
+                if Config.METRICS_ENABLED:
+                    cls.DECODE_SECONDS.observe((func.__name__,), seconds)
+
+        return decode_wrapper
+
+    @classmethod
+    def register_stats(cls, name: str, documentation: str, collect: Callable[[], Dict[str, int]]) -> None:
+        cls.STATS.append(Stats(name, documentation, collect))
+
+    @classmethod
+    def render(cls) -> str:
+        lines = [line for histogram in cls.ALL for line in histogram.render()]
+        lines.extend(line for stats in cls.STATS for line in stats.render())
+        return "\n".join(lines) + "\n"
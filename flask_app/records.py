@@ -0,0 +1,178 @@
+from sys import intern
+from typing import Callable, Optional
+
+from munch import DefaultMunch
+
+_UNSET = object()
+
+# Compact records for the test data and test results received from the backend. A large test result used to be tens of
+# thousands of dicts (or Munch objects), one for every field, core and trace. The keys that are known are slots and
+# any other key (like one added by a newer backend) is kept in an extra dict so that nothing sent is lost. Records can
+# be read and changed like a dict or like an object, so routes, forms and templates written for dicts and Munch work
+# with them unchanged. Records of responses that used to be a DefaultMunch return the same empty default for a missing
+# key so that templates can keep chaining on it.
+
+
+class Record:
+    __slots__ = ("_extra",)
+    FIELDS: frozenset = frozenset()
+    DEFAULT: Optional[Callable] = None  # Returned (called) for a missing key instead of raising
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELDS = frozenset(name for klass in cls.__mro__ for name in getattr(klass, "__slots__", tuple())
+                               if name != "_extra")
+
+    def __init__(self, **values):
+        self._extra: Optional[dict] = None
+        fields = self.FIELDS
+        for key, value in values.items():
+            if key in fields:
+                setattr(self, key, value)
+            else:
+                self[key] = value
+
+    def __getattr__(self, name: str):
+        # Only called for keys that are not a slot or a slot that is not set
+        if name != "_extra" and self._extra and name in self._extra:
+            return self._extra[name]
+        if self.DEFAULT is not None and name != "_extra" and not name.startswith("__"):
+            return self.DEFAULT()
+        raise AttributeError(f"{type(self).__name__} has no {name}")
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value) -> None:
+        if key in self.FIELDS:
+            setattr(self, key, value)
+            return
+        if self._extra is None:
+            self._extra = dict()
+        self._extra[key] = value
+
+    def _is_set(self, name: str) -> bool:
+        # Without going through __getattr__ so that the default is not mistaken for a value
+        try:
+            object.__getattribute__(self, name)
+            return True
+        except AttributeError:
+            return False
+
+    def __contains__(self, key: str) -> bool:
+        return self._is_set(key) if key in self.FIELDS else bool(self._extra) and key in self._extra
+
+    def get(self, key: str, default=None):
+        return self[key] if key in self else default
+
+    def to_dict(self) -> dict:
+        values = {name: getattr(self, name) for name in self.FIELDS if self._is_set(name)}
+        values.update(self._extra or dict())
+        return values
+
+    def copy(self, **changes) -> "Record":
+        # Shallow copy like dict(record, **changes)
+        return type(self)(**dict(self.to_dict(), **changes))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class FieldData(Record):
+    __slots__ = ("field", "data", "length", "item_number", "field_text")
+
+    def __init__(self, field=_UNSET, data=_UNSET, length=_UNSET, item_number=_UNSET, field_text=_UNSET, **extra):
+        # There is one of these for every field so the slots are set directly. Keys not sent are left unset. The same
+        # field names repeat in every core and variation, so they are interned to keep a single copy of each.
+        self._extra: Optional[dict] = extra or None
+        if field is not _UNSET:
+            self.field = intern(field) if isinstance(field, str) else field
+        if data is not _UNSET:
+            self.data = data
+        if length is not _UNSET:
+            self.length = length
+        if item_number is not _UNSET:
+            self.item_number = item_number
+        if field_text is not _UNSET:
+            self.field_text = intern(field_text) if isinstance(field_text, str) else field_text
+
+    @classmethod
+    def json_hook(cls, obj: dict):
+        # Used as the object_hook while parsing so that each field becomes a record as soon as it is parsed and its
+        # dict is released straight away
+        if isinstance(obj.get("data"), str) and ("field" in obj or "field_text" in obj):
+            return cls(**obj)
+        return obj
+
+
+class Core(Record):
+    # Cores of the input (macros, heaps, ecb levels and globals) and of the output (only macro_name, base_reg and
+    # field_data are sent)
+    __slots__ = ("id", "variation", "variation_name", "ecb_level", "heap_name", "macro_name", "global_name",
+                 "hex_data", "seg_name", "original_field_data", "is_global_record", "link", "link_status", "base_reg",
+                 "field_data")
+
+
+class Pnr(Record):
+    # PNR of the input and of the output (pnr_outputs)
+    __slots__ = ("id", "variation", "variation_name", "locator", "key", "data", "text", "link", "link_status",
+                 "field_item_len", "field_data", "field_data_item")
+
+
+class Tpfdf(Record):
+    __slots__ = ("id", "variation", "variation_name", "macro_name", "key", "field_data")
+
+
+class FileItem(Record):
+    __slots__ = ("id", "macro_name", "field", "count_field", "adjust", "repeat", "field_data")
+
+
+class PoolFile(Record):
+    __slots__ = ("id", "macro_name", "index_field", "rec_id", "fixed_forward_chain_label", "fixed_forward_chain_count",
+                 "field_data", "file_items")
+
+
+class FixedFile(Record):
+    __slots__ = ("id", "variation", "variation_name", "macro_name", "fixed_type", "fixed_ordinal", "rec_id",
+                 "fixed_forward_chain_label", "fixed_forward_chain_count", "field_data", "file_items", "pool_files")
+
+
+class Trace(Record):
+    __slots__ = ("label", "command", "instruction", "operands", "hits", "next_hits", "read1", "read2", "reg_pointer")
+
+
+class Output(Record):
+    __slots__ = ("result_id", "variation", "variation_name", "last_node", "regs", "cores", "pnr_outputs", "debug",
+                 "dumps", "messages", "traces")
+
+
+class TestData(Record):
+    __slots__ = ("id", "name", "owner", "seg_name", "stop_segments", "startup_script", "regs", "cores", "pnr", "tpfdf",
+                 "fixed_files", "outputs", "test_data_variation", "class_display", "stop_seg_string", "fields",
+                 "pnr_fields")
+
+
+class TestResult(Record):
+    __slots__ = ("id", "name", "owner", "result_id", "last_node", "variation", "variation_name", "dumps", "messages",
+                 "core_fields", "pnr_fields", "core_field_data", "pnr_field_data", "user_comment", "core_comment",
+                 "pnr_comment", "general_comment")
+    DEFAULT = DefaultMunch
+
+
+class ResultFile(Record):
+    # Fixed file of a test result with its items and pool file flattened into it
+    __slots__ = ("id", "variation", "variation_name", "fixed_macro_name", "fixed_rec_id", "fixed_type",
+                 "fixed_ordinal", "fixed_forward_chain_label", "fixed_forward_chain_count", "fixed_field_data",
+                 "fixed_item_label", "fixed_item_count_label", "fixed_item_adjust", "fixed_item_repeat",
+                 "fixed_item_field_data", "pool_macro_name", "pool_rec_id", "pool_fixed_label",
+                 "pool_forward_chain_label", "pool_forward_chain_count", "pool_field_data", "pool_item_label",
+                 "pool_item_count_label", "pool_item_adjust", "pool_item_repeat", "pool_item_field_data")
+    DEFAULT = DefaultMunch
+
+
+class TestResults(Record):
+    __slots__ = ("headers", "results", "cores", "pnr", "tpfdf", "files", "counters")
+    DEFAULT = DefaultMunch
@@ -0,0 +1,169 @@
+from dataclasses import dataclass, fields
+
+from munch import Munch
+
+# Bodies of the backend requests sent from forms. A new immutable body is built for every request. The type of each
+# field is checked when it is built, so a wrong value fails here and not as a confusing error from the backend.
+# The classes declare __slots__ themselves since dataclass(slots=True) needs Python 3.10.
+
+
+class InvalidFormData(TypeError):
+    # Raised by from_form for a value that is missing from the form or of the wrong type (like a variation that is not
+    # one of the choices). The response has the shape of a validation error of the backend, so that the form shows it
+    # on the field just like any other error.
+
+    def __init__(self, body_name: str, field_name: str, message: str, in_form: bool):
+        super().__init__(f"{body_name}.{field_name}: {message}")
+        self.response: Munch = Munch(error=True, message=str() if in_form else message,
+                                     error_fields=Munch({field_name: message} if in_form else dict()))
+
+
+@dataclass(frozen=True)
+class RequestBody:
+    __slots__ = ()
+
+    def __post_init__(self):
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if not self._valid(value, field.type):
+                raise TypeError(f"{type(self).__name__}.{field.name} has to be {field.type.__name__} and not "
+                                f"{type(value).__name__}")
+
+    @staticmethod
+    def _valid(value, field_type: type) -> bool:
+        return isinstance(value, field_type) and not (field_type is int and isinstance(value, bool))
+
+    @classmethod
+    def from_form(cls, form_data: dict, **values):
+        # Fields that are not in the form (like the template name from the url) are passed as keyword arguments. A
+        # value that is not valid raises InvalidFormData.
+        body_values = dict()
+        for field in fields(cls):
+            in_form = field.name not in values
+            value = form_data.get(field.name) if in_form else values[field.name]
+            if not cls._valid(value, field.type):
+                message = "This field is required." if value is None else "Not a valid value."
+                raise InvalidFormData(cls.__name__, field.name, message, in_form)
+            body_values[field.name] = value
+        return cls(**body_values)
+
+    def to_dict(self) -> dict:
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+
+@dataclass(frozen=True)
+class VariationRenameBody(RequestBody):
+    __slots__ = ("new_name",)
+    new_name: str
+
+
+@dataclass(frozen=True)
+class TestDataCreateBody(RequestBody):
+    __slots__ = ("name", "seg_name", "stop_segments", "startup_script")
+    name: str
+    seg_name: str
+    stop_segments: str
+    startup_script: str
+
+
+@dataclass(frozen=True)
+class TemplatePnrCreateBody(RequestBody):
+    __slots__ = ("name", "description", "key", "locator", "text", "field_data")
+    name: str
+    description: str
+    key: str
+    locator: str
+    text: str
+    field_data: str
+
+
+@dataclass(frozen=True)
+class TemplateGlobalCreateBody(RequestBody):
+    __slots__ = ("name", "description", "global_name", "is_global_record", "hex_data", "seg_name", "field_data")
+    name: str
+    description: str
+    global_name: str
+    is_global_record: bool
+    hex_data: str
+    seg_name: str
+    field_data: str
+
+
+@dataclass(frozen=True)
+class TemplateAaaCreateBody(RequestBody):
+    __slots__ = ("name", "description", "field_data")
+    name: str
+    description: str
+    field_data: str
+
+
+@dataclass(frozen=True)
+class TemplatePnrAddBody(RequestBody):
+    __slots__ = ("name", "key", "text", "field_data")
+    name: str
+    key: str
+    text: str
+    field_data: str
+
+
+@dataclass(frozen=True)
+class TemplateGlobalAddBody(RequestBody):
+    __slots__ = ("name", "global_name", "is_global_record", "hex_data", "seg_name", "field_data")
+    name: str
+    global_name: str
+    is_global_record: bool
+    hex_data: str
+    seg_name: str
+    field_data: str
+
+
+@dataclass(frozen=True)
+class TemplatePnrUpdateBody(RequestBody):
+    __slots__ = ("text", "field_data")
+    text: str
+    field_data: str
+
+
+@dataclass(frozen=True)
+class TemplateGlobalUpdateBody(RequestBody):
+    __slots__ = ("is_global_record", "hex_data", "seg_name", "field_data")
+    is_global_record: bool
+    hex_data: str
+    seg_name: str
+    field_data: str
+
+
+@dataclass(frozen=True)
+class TemplateAaaUpdateBody(RequestBody):
+    __slots__ = ("field_data",)
+    field_data: str
+
+
+@dataclass(frozen=True)
+class TemplateMergeLinkBody(RequestBody):
+    __slots__ = ("variation", "variation_name", "template_name")
+    variation: int
+    variation_name: str
+    template_name: str
+
+
+@dataclass(frozen=True)
+class TemplateLinkUpdateBody(RequestBody):
+    __slots__ = ("variation", "template_name", "new_template_name")
+    variation: int
+    template_name: str
+    new_template_name: str
+
+
+@dataclass(frozen=True)
+class TemplateLinkDeleteBody(RequestBody):
+    __slots__ = ("variation", "template_name")
+    variation: int
+    template_name: str
+
+
+@dataclass(frozen=True)
+class ResultCommentUpdateBody(RequestBody):
+    __slots__ = ("comment_type", "comment")
+    comment_type: str
+    comment: str
@@ -1,14 +1,55 @@
-from typing import List
+from hmac import compare_digest
+from time import perf_counter
+from typing import List, Dict
 
-from flask import render_template, redirect, url_for
+from flask import render_template, redirect, url_for, request, Response, abort
 from flask_login import current_user
 
+from config import Config
 from flask_app import tpf2_app
-from flask_app.forms import UploadForm
+from flask_app.compression import Compression
+from flask_app.forms import UploadForm, BulkUploadForm
+from flask_app.metrics import Metrics, RequestTimer
 from flask_app.server import Server
 from flask_app.user import cookie_login_required
 
 
+@tpf2_app.before_request
+def start_request_timer():
+    RequestTimer.start()
+
+
+@tpf2_app.after_request
+def observe_page(response: Response) -> Response:
+    if request.endpoint not in ("metrics", "static"):
+        Metrics.observe_page(request.endpoint)
+    if Config.SERVER_TIMING:
+        response.headers["Server-Timing"] = RequestTimer.server_timing()
+    return response
+
+
+# Registered after observe_page so that it runs before it and the compression time is in the Server-Timing header
+@tpf2_app.after_request
+def compress_response(response: Response) -> Response:
+    return Compression.compress_response(request, response)
+
+
+@tpf2_app.context_processor
+def server_timing_summary() -> dict:
+    return {"server_timing_summary": RequestTimer.summary}
+
+
+@tpf2_app.route("/metrics")
+def metrics():
+    # Metrics are only open when the token is not set outside production
+    if not Config.METRICS_TOKEN:
+        if Config.CI_SECURITY:
+            abort(404)
+    elif not compare_digest(request.headers.get("Authorization", str()), f"Bearer {Config.METRICS_TOKEN}"):
+        abort(401)
+    return Response(Metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @tpf2_app.route("/")
 @tpf2_app.route("/index")
 def home():
@@ -33,24 +74,55 @@ def upload_segments():
         if not current_user.is_authenticated:
             return redirect(url_for("logout"))
         return render_template("upload_form.html", form=form, title="Upload", response=dict())
+    if form.unchanged:
+        response = {"message": f"{form.blob_name} is unchanged since it was last uploaded. It is not uploaded again."}
+        return render_template("upload_form.html", form=form, title="Upload", response=response)
     response: dict = Server.upload_segment(form.blob_name)
     if not current_user.is_authenticated:
         return redirect(url_for("logout"))
+    form.update_manifest(response)
     return render_template("upload_form.html", form=form, title="Upload", response=response)
 
 
+@tpf2_app.route("/segments/upload/bulk", methods=["GET", "POST"])
+@cookie_login_required
+def bulk_upload_segments():
+    form = BulkUploadForm()
+    if not form.validate_on_submit():
+        if not current_user.is_authenticated:
+            return redirect(url_for("logout"))
+        return render_template("bulk_upload_form.html", form=form, title="Bulk Upload", responses=dict())
+    start = perf_counter()
+    responses: Dict[str, dict] = Server.upload_segments(form.blob_names)
+    assembly_seconds: float = perf_counter() - start
+    if not current_user.is_authenticated:
+        return redirect(url_for("logout"))
+    form.update_manifest(responses)
+    return render_template("bulk_upload_form.html", form=form, title="Bulk Upload", responses=responses,
+                           assembly_seconds=assembly_seconds)
+
+
 @tpf2_app.route("/segments/<string:seg_name>/instructions")
 @cookie_login_required
 def instructions(seg_name: str):
-    response: dict = Server.instructions(seg_name)
-    total_count: int = len(response["formatted_instructions"])
-    unsupported_count: int = len(response["formatted_not_supported"])
-    supported_percentage: int = (total_count - unsupported_count) * 100 // total_count if total_count > 0 else 0
+    count: int = max(request.args.get("count", Config.INSTRUCTION_PAGE_SIZE, type=int), 1)
+    page: int = max(request.args.get("page", 1, type=int), 1)
+    start: int = max(request.args.get("start", (page - 1) * count, type=int), 0)
+    response: dict = Server.instructions(seg_name, start, count)
     if not current_user.is_authenticated:
         return redirect(url_for("logout"))
+    total_count: int = response["total_count"]
+    next_start: int = start + count if start + count < total_count else 0
+    if request.args.get("rows"):
+        # Incremental loading: only the rows of the requested window are sent
+        return render_template("instruction_rows.html", instructions=response["formatted_instructions"],
+                               seg_name=seg_name, count=count, next_start=next_start)
+    unsupported_count: int = len(response["formatted_not_supported"])
+    supported_percentage: int = (total_count - unsupported_count) * 100 // total_count if total_count > 0 else 0
     return render_template("instructions.html", title="Assembly", instructions=response["formatted_instructions"],
                            seg_name=seg_name, not_supported_instructions=response["formatted_not_supported"],
-                           response=response, supported_percentage=supported_percentage)
+                           response=response, supported_percentage=supported_percentage, count=count,
+                           start=start, next_start=next_start)
 
 
 @tpf2_app.route("/macros")
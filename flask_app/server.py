@@ -1,44 +1,485 @@
+import pickle
+import re
 from base64 import b64decode
-from types import SimpleNamespace
-from typing import Dict, List, Union
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import partial
+from http.cookiejar import DefaultCookiePolicy
+from io import BytesIO
+from threading import Lock, current_thread
+from time import perf_counter, monotonic
+from typing import Dict, List, Union, Optional, Callable, Tuple
 from urllib.parse import quote
+from uuid import uuid4
 
-import requests
-from flask import flash
+from cachetools import TTLCache
+from flask import flash, g, has_request_context, copy_current_request_context, request, session
 from flask_login import current_user, logout_user
 from munch import Munch, DefaultMunch
-from requests import Response
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 
 from config import Config
+from flask_app.compression import Compression
+from flask_app.json_stream import JsonStream
+from flask_app.metrics import Metrics
+from flask_app.records import FieldData, Core, Pnr, Tpfdf, FileItem, PoolFile, FixedFile, Trace, Output, TestData, \
+    TestResult, ResultFile, TestResults
+
+
+# cp037 maps every byte to a unique character, so the characters that are not displayed can be replaced after decoding
+EBCDIC_NON_DISPLAY: Dict[int, str] = {ord(bytes([byte]).decode("cp037")): "\u2666" for byte in range(0x100)
+                                      if byte < 0x40 or not bytes([byte]).decode("cp037").isascii()}
+
+
+class ServerSession:
+    _session: Optional[Session] = None
+    _lock: Lock = Lock()
+
+    @classmethod
+    def get(cls) -> Session:
+        # One keep-alive session per worker process shared by all its threads. Cookies are blocked so that nothing set
+        # by the backend for one user is ever replayed for another.
+        if cls._session is None:
+            with cls._lock:
+                if cls._session is None:
+                    session = Session()
+                    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=list()))
+                    session.headers["Accept-Encoding"] = Compression.ACCEPT_ENCODING
+                    # Every request thread and every fan out thread may hold a connection at the same time
+                    adapter = HTTPAdapter(pool_connections=1,
+                                          pool_maxsize=Config.SERVER_POOL_SIZE + Config.FAN_OUT_WORKERS)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    cls._session = session
+        return cls._session
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        requests_sent, connections_opened = 0, 0
+        if cls._session is not None:
+            for adapter in set(cls._session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    requests_sent += pool.num_requests
+                    connections_opened += pool.num_connections
+        return {"requests": requests_sent, "connections": connections_opened,
+                "reused": max(requests_sent - connections_opened, 0)}
+
+
+class RequestMemo:
+    # Memoizes backend results for the duration of a single Flask request. Entries live on flask.g and hence are
+    # discarded at the end of the request.
 
+    @staticmethod
+    def _store() -> Optional[dict]:
+        if not has_request_context():
+            return None
+        if "server_memo" not in g:
+            g.server_memo = dict()
+            g.backend_calls_saved = 0
+        return g.server_memo
+
+    @classmethod
+    def get(cls, key: tuple):
+        store = cls._store()
+        if store is None or key not in store:
+            return None
+        cls.call_saved()
+        return store[key]
+
+    @classmethod
+    def call_saved(cls) -> None:
+        if cls._store() is not None:
+            g.backend_calls_saved += 1
+
+    @classmethod
+    def set(cls, key: tuple, value) -> None:
+        store = cls._store()
+        if store is not None and value:
+            store[key] = value
+
+    @classmethod
+    def forget(cls, key: tuple) -> None:
+        store = cls._store()
+        if store is not None:
+            store.pop(key, None)
+
+    @staticmethod
+    def calls_saved() -> int:
+        return g.get("backend_calls_saved", 0) if has_request_context() else 0
+
+
+class PrefetchedResponses:
+    # Backend responses already fetched for the current request by the async mode (flask_app/asgi.py) together with
+    # the seconds they took, the bytes received and the ConditionalCache entry whose validators were sent (if any).
+    # They are kept in the WSGI environ and used once in place of sending the same request.
+    ENVIRON_KEY = "tpf2.prefetched"
+
+    @staticmethod
+    def key(method: str, url: str, params: Optional[dict] = None) -> tuple:
+        return method, url, tuple(sorted((params or dict()).items()))
+
+    @classmethod
+    def pop(cls, method: str, url: str,
+            params: Optional[dict] = None) -> Optional[Tuple[Response, float, int, Optional[dict]]]:
+        if not has_request_context() or cls.ENVIRON_KEY not in request.environ:
+            return None
+        return request.environ[cls.ENVIRON_KEY].pop(cls.key(method, url, params), None)
+
+
+class FieldCache:
+    # Process wide cache of label lookups shared by all threads. Symbol tables only change when macros are uploaded
+    # again, so entries are kept till they expire or the cache is cleared on upload.
+    _cache: TTLCache = TTLCache(maxsize=Config.FIELD_CACHE_SIZE, ttl=Config.FIELD_CACHE_TTL)
+    _lock: Lock = Lock()
+    _hits: int = 0
+    _misses: int = 0
+
+    @classmethod
+    def get(cls, key: tuple) -> Optional[dict]:
+        with cls._lock:
+            label_ref = cls._cache.get(key)
+            if label_ref is None:
+                cls._misses += 1
+                return None
+            cls._hits += 1
+        return dict(label_ref)
+
+    @classmethod
+    def set(cls, key: tuple, label_ref: dict) -> None:
+        with cls._lock:
+            cls._cache[key] = dict(label_ref)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._cache.clear()
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        with cls._lock:
+            return {"hits": cls._hits, "misses": cls._misses, "size": len(cls._cache), "max_size": cls._cache.maxsize}
+
+
+class TestDataCache:
+    # Process wide cache of decoded test data so that the confirmation page shown after a change does not download and
+    # decode the whole test data again. Views always fetch the test data (a conditional GET, see ConditionalCache) and
+    # keep it here as the base of the next change. Changes accepted by the backend are patched into the base (see
+    # Server._update_test_data), which is then served once, to the page that follows the change. Any other change
+    # invalidates the entry. Each entry is keyed by the test data id, the user and a version. The version is kept in
+    # the session (which reaches every worker), so an entry is only used by the session that fetched or changed it and
+    # a worker without that version fetches the test data again. A new version is only created when the worker does not
+    # have the entry of the version in the session or the test data was changed, so views do not rewrite the session.
+    # Entries are pickled snapshots and every read gets its own copy, so nothing done to it reaches the cache.
+    _cache: TTLCache = TTLCache(maxsize=Config.TEST_DATA_CACHE_SIZE, ttl=Config.TEST_DATA_CACHE_TTL)
+    _lock: Lock = Lock()
+    _hits: int = 0
+    _misses: int = 0
+    SESSION_KEY = "test_data_versions"
+    SESSION_VERSIONS: int = 10  # Versions of the most recently used test data kept in the session cookie
+
+    @staticmethod
+    def _enabled() -> bool:
+        return Config.TEST_DATA_CACHE_TTL > 0 and has_request_context() and current_user.is_authenticated
+
+    @classmethod
+    def _key(cls, test_data_id: str) -> Optional[tuple]:
+        version = session.get(cls.SESSION_KEY, dict()).get(test_data_id) if cls._enabled() else None
+        return (test_data_id, current_user.get_id(), version) if version else None
+
+    @classmethod
+    def get(cls, test_data_id: str) -> Optional[dict]:
+        # The patched test data if it was not served yet. It is kept as the base of the next change once served.
+        key = cls._key(test_data_id)
+        if key is None:
+            return None
+        with cls._lock:
+            snapshot, patched = cls._cache.get(key, (None, False))
+            if not patched:
+                cls._misses += 1
+                return None
+            cls._hits += 1
+            cls._cache[key] = (snapshot, False)
+        return pickle.loads(snapshot)
+
+    @classmethod
+    def contains(cls, test_data_id: str) -> bool:
+        # Whether get would serve the test data, without counting it as a hit or a miss
+        key = cls._key(test_data_id)
+        with cls._lock:
+            return key is not None and cls._cache.get(key, (None, False))[1]
+
+    @classmethod
+    def base(cls, test_data_id: str) -> Optional[dict]:
+        # The test data as last fetched or changed by this session, to apply a change to
+        key = cls._key(test_data_id)
+        with cls._lock:
+            snapshot = cls._cache.get(key, (None, False))[0] if key is not None else None
+        return pickle.loads(snapshot) if snapshot is not None else None
+
+    @classmethod
+    def set(cls, test_data_id: str, test_data: dict, patched: bool = False) -> None:
+        if not cls._enabled() or not test_data:
+            return
+        snapshot = pickle.dumps(test_data, protocol=pickle.HIGHEST_PROTOCOL)
+        key = cls._key(test_data_id)
+        with cls._lock:
+            if key is not None and key in cls._cache:
+                # Only this worker has entries of the versions it created, so the entry is replaced in place
+                cls._cache[key] = (snapshot, patched)
+                return
+        versions: dict = dict(session.get(cls.SESSION_KEY, dict()))
+        version = uuid4().hex[:12]
+        with cls._lock:
+            cls._cache.pop((test_data_id, current_user.get_id(), versions.pop(test_data_id, None)), None)
+            cls._cache[(test_data_id, current_user.get_id(), version)] = (snapshot, patched)
+        versions[test_data_id] = version
+        session[cls.SESSION_KEY] = dict(list(versions.items())[-cls.SESSION_VERSIONS:])
+
+    @classmethod
+    def invalidate(cls, test_data_id: str) -> None:
+        if not cls._enabled() or test_data_id not in session.get(cls.SESSION_KEY, dict()):
+            return
+        versions: dict = dict(session[cls.SESSION_KEY])
+        with cls._lock:
+            cls._cache.pop((test_data_id, current_user.get_id(), versions.pop(test_data_id)), None)
+        session[cls.SESSION_KEY] = versions
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._cache.clear()
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        with cls._lock:
+            return {"hits": cls._hits, "misses": cls._misses, "size": len(cls._cache), "max_size": cls._cache.maxsize}
+
+
+class ConditionalCache:
+    # Process wide cache of backend response bodies that came with a validator (ETag or Last-Modified). The next GET of
+    # the same url sends the validator and a 304 Not Modified is answered with the cached body, so an unchanged document
+    # costs only headers. Bodies are kept as received and parsed again, so callers are free to change what they get.
+    # The cache is bounded by the total size of the bodies.
+    PATHS = tuple(re.compile(path) for path in (r"^/test_data/[^/]+$", r"^/templates/[^/]+$", r"^/test_results$",
+                                                r"^/segments$"))
+    _cache: TTLCache = TTLCache(maxsize=Config.CONDITIONAL_CACHE_BYTES, ttl=Config.CONDITIONAL_CACHE_TTL,
+                                getsizeof=lambda entry: len(entry["content"]))
+    _lock: Lock = Lock()
+    _hits: int = 0
+    _misses: int = 0
+
+    @classmethod
+    def _key(cls, url: str, params: Optional[dict]) -> Optional[tuple]:
+        if not Config.CONDITIONAL_GET or not any(path.match(url) for path in cls.PATHS):
+            return None
+        return current_user.domain, url, tuple(sorted((params or dict()).items()))
+
+    @classmethod
+    def get(cls, url: str, params: Optional[dict]) -> Optional[dict]:
+        key = cls._key(url, params)
+        if key is None:
+            return None
+        with cls._lock:
+            return cls._cache.get(key)
+
+    @staticmethod
+    def validators(entry: dict) -> Dict[str, str]:
+        headers = dict()
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @classmethod
+    def update(cls, url: str, params: Optional[dict], response: Response, entry: Optional[dict]) -> Response:
+        # Returns the response to use for a GET sent with the validators of entry (if any)
+        key = cls._key(url, params)
+        if key is None:
+            return response
+        if response.status_code == 304 and entry is not None:
+            with cls._lock:
+                cls._hits += 1
+            return cls._cached_response(entry, response)
+        with cls._lock:
+            cls._misses += 1
+        etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return response
+        entry = {"etag": etag, "last_modified": last_modified, "content": response.content,
+                 "encoding": response.encoding, "content_type": response.headers.get("Content-Type")}
+        if len(entry["content"]) <= cls._cache.maxsize:
+            with cls._lock:
+                cls._cache[key] = entry
+        return response
+
+    @staticmethod
+    def _cached_response(entry: dict, not_modified: Response) -> Response:
+        # A 200 response with the cached body that is read from raw like a streamed one
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(not_modified.headers)
+        response.headers["Content-Type"] = entry["content_type"]
+        response.headers["Content-Length"] = str(len(entry["content"]))
+        response.headers.pop("Content-Encoding", None)  # The cached body is already decompressed
+        response.encoding = entry["encoding"]
+        response.raw = BytesIO(entry["content"])
+        response.url = not_modified.url
+        response.request = not_modified.request
+        return response
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._cache.clear()
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        with cls._lock:
+            return {"hits": cls._hits, "misses": cls._misses, "entries": len(cls._cache),
+                    "bytes": int(cls._cache.currsize), "max_bytes": cls._cache.maxsize}
+
+
+class CatalogCache:
+    # Process wide cache of the segment and macro catalogs of each domain shared by all threads. They only change when
+    # segments are uploaded, which invalidates the domain, so the TTL only bounds changes made outside this app.
+    # Instruction listings run into megabytes, so the cache is bounded by the size of the bodies the catalogs were
+    # parsed from and each entry is kept as (catalog, size).
+    _cache: TTLCache = TTLCache(maxsize=Config.CATALOG_CACHE_BYTES, ttl=Config.CATALOG_CACHE_TTL,
+                                getsizeof=lambda entry: entry[1])
+    _lock: Lock = Lock()
+    _hits: int = 0
+    _misses: int = 0
+
+    @classmethod
+    def get(cls, key: tuple) -> Union[list, dict, None]:
+        with cls._lock:
+            entry = cls._cache.get(key)
+            if entry is None:
+                cls._misses += 1
+                return None
+            cls._hits += 1
+        # Callers may add keys to the response (or append to a list), so they get their own shallow copy
+        return entry[0].copy()
+
+    @classmethod
+    def set(cls, key: tuple, catalog: Union[list, dict], size: int) -> None:
+        if size > cls._cache.maxsize:
+            return
+        with cls._lock:
+            cls._cache[key] = (catalog.copy(), size)
+
+    @classmethod
+    def invalidate(cls, domain: str) -> None:
+        with cls._lock:
+            for key in [key for key in cls._cache.keys() if key[0] == domain]:
+                cls._cache.pop(key, None)
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        with cls._lock:
+            return {"hits": cls._hits, "misses": cls._misses, "entries": len(cls._cache),
+                    "bytes": int(cls._cache.currsize), "max_bytes": cls._cache.maxsize}
+
+
+class LazyData:
+    # Stands in for the decoded [hex, number, char] list of a field. The data is decoded the first time it is read
+    # (normally from a template) and then kept, so fields that are never displayed are never decoded.
+    __slots__ = ("encoded_data", "_decoded_data")
+
+    def __init__(self, encoded_data: str):
+        self.encoded_data: str = encoded_data
+        self._decoded_data: Optional[list] = None
+
+    @classmethod
+    def wrap(cls, data) -> "LazyData":
+        return data if isinstance(data, cls) else cls(data)
+
+    @classmethod
+    def json_hook(cls, obj: dict) -> Union[dict, FieldData]:
+        # Same as FieldData.json_hook but the data of each field is wrapped too
+        if isinstance(obj.get("data"), str) and ("field" in obj or "field_text" in obj):
+            obj["data"] = cls(obj["data"])
+            return FieldData(**obj)
+        return obj
+
+    @property
+    def decoded_data(self) -> list:
+        if self._decoded_data is None:
+            self._decoded_data = Server._decode_data(self.encoded_data)
+        return self._decoded_data
+
+    def __getitem__(self, index):
+        return self.decoded_data[index]
+
+    def __iter__(self):
+        return iter(self.decoded_data)
+
+    def __len__(self) -> int:
+        return len(self.decoded_data)
 
-class RequestType:
-    VARIATION = SimpleNamespace(new_name=str())
-    TEMPLATE_PNR_UPDATE = SimpleNamespace(field_data=str(), text=str())
-    TEMPLATE_GLOBAL_UPDATE = SimpleNamespace(field_data=str(), hex_data=str(), is_global_record=bool(), seg_name=str())
-    TEMPLATE_AAA_UPDATE = SimpleNamespace(field_data=str())
-    TEMPLATE_PNR_ADD = SimpleNamespace(field_data=str(), text=str(), key=str(), name=str())
-    TEMPLATE_GLOBAL_ADD = SimpleNamespace(field_data=str(), hex_data=str(), is_global_record=bool(), seg_name=str(),
-                                          name=str(), global_name=str())
-    TEMPLATE_PNR_CREATE = SimpleNamespace(field_data=str(), text=str(), key=str(), name=str(), locator=str(),
-                                          description=str())
-    TEMPLATE_GLOBAL_CREATE = SimpleNamespace(field_data=str(), hex_data=str(), is_global_record=bool(), seg_name=str(),
-                                             name=str(), global_name=str(), description=str())
-    TEMPLATE_AAA_CREATE = SimpleNamespace(name=str(), description=str(), field_data=str())
-    TEMPLATE_MERGE_LINK = SimpleNamespace(variation=int(), variation_name=str(), template_name=str())
-    TEMPLATE_LINK_UPDATE = SimpleNamespace(variation=int(), new_template_name=str(), template_name=str())
-    TEMPLATE_LINK_DELETE = SimpleNamespace(variation=int(), template_name=str())
-    RESULT_COMMENT_UPDATE = SimpleNamespace(comment_type=str(), comment=str())
-    TEST_DATA_CREATE = SimpleNamespace(name=str(), seg_name=str(), stop_segments=str(), startup_script=str())
+    def __eq__(self, other) -> bool:
+        return self.decoded_data == (other.decoded_data if isinstance(other, LazyData) else other)
+
+    def __repr__(self) -> str:
+        return repr(self.decoded_data)
 
 
 class Server:
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock: Lock = Lock()
+    _batch_fields_retry_at: float = 0.0  # Time (monotonic) after which the batch endpoint is tried again
+    _batch_upload_retry_at: float = 0.0
+
     class Timeout(Exception):
         pass
 
     class SystemError(Exception):
         pass
 
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=Config.FAN_OUT_WORKERS,
+                                                       thread_name_prefix="server")
+        return cls._executor
+
+    @classmethod
+    def fan_out(cls, *calls: Callable) -> list:
+        # Runs independent backend calls concurrently and returns their results in order. Every call runs in its own
+        # copy of the request context. Timeout and SystemError are raised in the caller just like a sequential call
+        # and a session timeout detected by any call logs out the user of the calling request.
+        if len(calls) < 2 or current_thread().name.startswith("server"):
+            return [call() for call in calls]
+
+        def run(call: Callable) -> tuple:
+            return call(), current_user.is_authenticated
+
+        futures = [cls._get_executor().submit(copy_current_request_context(run), call) for call in calls]
+        wait(futures)
+        results = list()
+        error: Optional[Exception] = None
+        for future in futures:
+            if future.exception() is not None:
+                error = error or future.exception()
+                results.append(None)
+                continue
+            result, is_authenticated = future.result()
+            if not is_authenticated and current_user.is_authenticated:
+                logout_user()
+            results.append(result)
+        if error is not None:
+            raise error
+        return results
+
     @staticmethod
     def _send_request(url, method: str = "GET", **kwargs) -> Response:
         request_url = f"{Config.SERVER_URL}{url}"
@@ -47,34 +488,126 @@ class Server:
                 return Response()
             auth_header = {"Authorization": f"Bearer {current_user.api_key}"}
             kwargs["headers"] = auth_header
-        if method == "GET":
-            response: Response = requests.get(request_url, **kwargs)
-        elif method == "POST":
-            response: Response = requests.post(request_url, **kwargs)
-        elif method == "PATCH":
-            response: Response = requests.patch(request_url, **kwargs)
-        elif method == "DELETE":
-            response: Response = requests.delete(request_url, **kwargs)
-        else:
+        if method not in ("GET", "POST", "PATCH", "DELETE"):
             raise TypeError
+        if method != "GET" and url.startswith("/test_data/"):
+            RequestMemo.forget(("test_data", url.split("/")[2], current_user.get_id()))
+            TestDataCache.invalidate(url.split("/")[2])
+        cached = ConditionalCache.get(url, kwargs.get("params")) \
+            if method == "GET" and "headers" in kwargs and not kwargs.get("stream") else None
+        if cached is not None:
+            kwargs["headers"].update(ConditionalCache.validators(cached))
+        prefetched = PrefetchedResponses.pop(method, url, kwargs.get("params"))
+        if prefetched is not None:
+            response, seconds, response_bytes, cached = prefetched
+        else:
+            kwargs.setdefault("timeout", (Config.SERVER_CONNECT_TIMEOUT, Config.SERVER_READ_TIMEOUT))
+            start = perf_counter()
+            response: Response = ServerSession.get().request(method, request_url, **kwargs)
+            seconds = perf_counter() - start
+            response_bytes = None
+        request_body = response.request.body
+        if kwargs.get("stream"):
+            # A streamed body is not read yet so only its Content-Length (if any) is known
+            if response_bytes is None:
+                response_bytes = int(response.headers.get("Content-Length", -1))
+            decoded_bytes = -1
+        else:
+            decoded_bytes = len(response.content)
+            # The raw urllib3 response counts the bytes read from the connection, i.e. before they are decompressed
+            response_bytes = response.raw.tell() if response_bytes is None else response_bytes
+        Metrics.observe_backend(method, url, response.status_code, seconds, len(request_body or b""), response_bytes,
+                                decoded_bytes)
+        if method == "GET" and not kwargs.get("stream"):
+            response = ConditionalCache.update(url, kwargs.get("params"), response, cached)
         return response
 
     @classmethod
-    def _common_request(cls, url: str, method: str = "GET", **kwargs) -> Union[list, dict]:
+    def _common_request(cls, url: str, method: str = "GET", object_hook: Optional[Callable] = None,
+                        **kwargs) -> Union[list, dict]:
         response = cls._send_request(url, method, **kwargs)
         if response.status_code == 401 and current_user.is_authenticated:
             flash("Session timeout. Please login again.")
             logout_user()
-        return response.json() if response.status_code == 200 else dict()
+        return cls._parse_json(response, object_hook) if response.status_code == 200 else dict()
+
+    @classmethod
+    def _stream_request(cls, url: str, item_hooks: Dict[str, Callable], method: str = "GET",
+                        **kwargs) -> Union[list, dict]:
+        # Same as _common_request but the body is parsed while it is read. Each item of the arrays named in item_hooks
+        # is passed to its hook as soon as it is parsed (see JsonStream), so its raw text is released straight away.
+        response = cls._send_request(url, method, stream=True, **kwargs)
+        if response.status_code == 401 and current_user.is_authenticated:
+            flash("Session timeout. Please login again.")
+            logout_user()
+        if response.status_code != 200:
+            if response.raw is not None:
+                response.close()
+            return dict()
+        with response:
+            start = perf_counter()
+            stream = JsonStream(response.iter_content(chunk_size=Config.STREAM_CHUNK_SIZE),
+                                encoding=response.encoding or "utf-8", object_hook=LazyData.json_hook)
+            body = stream.load(item_hooks)
+        Metrics.observe_parse(method, response.request.path_url, perf_counter() - start)
+        return body
+
+    @classmethod
+    def _update_test_data(cls, test_data_id: str, url: str, method: str, patch: Callable[[TestData], None],
+                          **kwargs) -> dict:
+        # Sends a change to the test data. Once the backend accepts it, the same change is made by patch to the cached
+        # test data (a copy of its own), so that the page that follows the change does not download it again.
+        test_data = TestDataCache.base(test_data_id)
+        response = cls._common_request(url, method, **kwargs)
+        if test_data is None or not response or response.get("error"):
+            return response
+        try:
+            patch(test_data)
+        except (KeyError, TypeError, AttributeError):
+            # The entry was invalidated when the change was sent, so test data that is not of the shape the patch
+            # expects is just not cached again and the next page fetches it
+            return response
+        TestDataCache.set(test_data_id, test_data, patched=True)
+        return response
+
+    @staticmethod
+    def _parse_json(response: Response, object_hook: Optional[Callable] = None) -> Union[list, dict]:
+        start = perf_counter()
+        body = response.json(object_hook=object_hook)
+        Metrics.observe_parse(response.request.method, response.request.path_url, perf_counter() - start)
+        return body
+
+    @classmethod
+    def _catalog_request(cls, url: str, prepare: Optional[Callable[[dict], None]] = None) -> Union[list, dict]:
+        # prepare adds what is derived from the catalog to it before it is cached, so that it is done once per fetch
+        cache_key = (current_user.domain, url) if current_user.is_authenticated else None
+        catalog = CatalogCache.get(cache_key) if cache_key else None
+        if catalog is not None:
+            return catalog
+        response = cls._send_request(url)
+        if response.status_code == 401 and current_user.is_authenticated:
+            flash("Session timeout. Please login again.")
+            logout_user()
+        catalog = cls._parse_json(response) if response.status_code == 200 else dict()
+        if catalog and prepare:
+            prepare(catalog)
+        if catalog and cache_key:
+            CatalogCache.set(cache_key, catalog, len(response.content))
+        return catalog
 
     @classmethod
     def _request_with_exception(cls, url: str, method: str = "GET", **kwargs) -> Union[list, Munch]:
+        return DefaultMunch.fromDict(cls._json_with_exception(url, method, **kwargs), DefaultMunch())
+
+    @classmethod
+    def _json_with_exception(cls, url: str, method: str = "GET", object_hook: Optional[Callable] = None,
+                             **kwargs) -> Union[list, dict]:
         response = cls._send_request(url, method, **kwargs)
         if response.status_code == 401 and current_user.is_authenticated:
             raise cls.Timeout
         if response.status_code != 200:
             raise cls.SystemError
-        return DefaultMunch.fromDict(response.json(), DefaultMunch())
+        return cls._parse_json(response, object_hook)
 
     @staticmethod
     def _decode_data(encoded_data) -> List[str]:
@@ -89,45 +622,86 @@ class Server:
             number_data -= 0x10000
         if len(hex_data) == 8 and number_data > 0x7FFFFFFF:
             number_data -= Config.REG_MAX + 1
-        char_data = "".join([bytes([char]).decode("cp037") if bytes([char]).decode("cp037").isascii() and char >= 0x40
-                             else "\u2666" for char in data])
+        char_data = data.decode("cp037").translate(EBCDIC_NON_DISPLAY)
         return [hex_data, number_data, char_data]
 
     @staticmethod
     def _decode_regs(regs: Dict[str, int]) -> Dict[str, list]:
         return {reg: [f"{value & Config.REG_MAX:08X}", value] for reg, value in regs.items()}
 
-    @classmethod
-    def _decode_test_data(cls, test_data: dict) -> dict:
-        if "regs" in test_data and test_data["regs"]:
-            test_data["regs"] = cls._decode_regs(test_data["regs"])
-        for core in test_data["cores"]:
-            core["hex_data"] = cls._decode_data(core["hex_data"])
-            for field_data in core["field_data"]:
-                field_data["data"] = cls._decode_data(field_data["data"])
-        for pnr in test_data["pnr"]:
+    @staticmethod
+    def _field_data(items: list, lazy: bool = True) -> List[FieldData]:
+        # Fields are already records if the json was parsed with FieldData.json_hook (or LazyData.json_hook)
+        records = [item if isinstance(item, FieldData) else FieldData(**item) for item in items]
+        if lazy:
+            for item in records:
+                if not isinstance(item.data, LazyData):
+                    item.data = LazyData(item.data)
+        return records
+
+    @classmethod
+    @Metrics.timed_decode
+    def _decode_test_data(cls, test_data: dict) -> TestData:
+        # Builds the records of the input of the test data and decodes it in the same walk. Outputs are left to callers.
+        test_data = TestData(**test_data)
+        if "regs" in test_data and test_data.regs:
+            test_data.regs = cls._decode_regs(test_data.regs)
+        cores = list()
+        for core in test_data.cores:
+            core = Core(**core)
+            core.hex_data = cls._decode_data(core.hex_data)
+            core.field_data = cls._field_data(core.field_data)
+            cores.append(core)
+        test_data.cores = cores
+        pnrs = list()
+        for pnr in test_data.pnr:
+            pnr = Pnr(**pnr)
             if "field_data_item" in pnr:
-                for field_data in pnr["field_data_item"]:
-                    field_data["data"] = cls._decode_data(field_data["data"])
-        for tpfdf in test_data["tpfdf"]:
-            for field_data in tpfdf["field_data"]:
-                field_data["data"] = cls._decode_data(field_data["data"])
-        for fixed_file in test_data["fixed_files"]:
-            fixed_file["rec_id"] = hex(fixed_file["rec_id"])[2:].upper()
-            for field_data in fixed_file["field_data"]:
-                field_data["data"] = cls._decode_data(field_data["data"])
-            for file_item in fixed_file["file_items"]:
-                for field_data in file_item["field_data"]:
-                    field_data["data"] = cls._decode_data(field_data["data"])
-            for pool_file in fixed_file["pool_files"]:
-                pool_file["rec_id"] = hex(pool_file["rec_id"])[2:].upper()
-                for field_data in pool_file["field_data"]:
-                    field_data["data"] = cls._decode_data(field_data["data"])
-                for file_item in pool_file["file_items"]:
-                    for field_data in file_item["field_data"]:
-                        field_data["data"] = cls._decode_data(field_data["data"])
+                pnr.field_data_item = cls._field_data(pnr.field_data_item)
+            pnrs.append(pnr)
+        test_data.pnr = pnrs
+        test_data.tpfdf = [Tpfdf(**dict(tpfdf, field_data=cls._field_data(tpfdf["field_data"])))
+                           for tpfdf in test_data.tpfdf]
+        fixed_files = list()
+        for fixed_file in test_data.fixed_files:
+            fixed_file = FixedFile(**fixed_file)
+            fixed_file.rec_id = hex(fixed_file.rec_id)[2:].upper()
+            fixed_file.field_data = cls._field_data(fixed_file.field_data)
+            fixed_file.file_items = cls._decode_file_items(fixed_file.file_items)
+            pool_files = list()
+            for pool_file in fixed_file.pool_files:
+                pool_file = PoolFile(**pool_file)
+                pool_file.rec_id = hex(pool_file.rec_id)[2:].upper()
+                pool_file.field_data = cls._field_data(pool_file.field_data)
+                pool_file.file_items = cls._decode_file_items(pool_file.file_items)
+                pool_files.append(pool_file)
+            fixed_file.pool_files = pool_files
+            fixed_files.append(fixed_file)
+        test_data.fixed_files = fixed_files
         return test_data
 
+    @classmethod
+    def _decode_file_items(cls, file_items: list) -> List[FileItem]:
+        return [FileItem(**dict(file_item, field_data=cls._field_data(file_item["field_data"])))
+                for file_item in file_items]
+
+    @classmethod
+    def _decode_output(cls, output: dict, run: bool) -> Output:
+        # The outputs of a run have their regs and field data decoded. The expected output of the test data is shown as
+        # it is received.
+        output = Output(**output)
+        if run and "regs" in output and output.regs:
+            output.regs = cls._decode_regs(output.regs)
+        if "cores" in output:
+            output.cores = [Core(**dict(core, field_data=cls._field_data(core["field_data"], lazy=run)))
+                            for core in output.cores]
+        if "pnr_outputs" in output:
+            output.pnr_outputs = [Pnr(**dict(pnr, field_data=cls._field_data(pnr["field_data"], lazy=run)))
+                                  for pnr in output.pnr_outputs]
+        if "traces" in output and output.traces:
+            output.traces = [Trace(**trace) for trace in output.traces]
+        return output
+
     @classmethod
     def authenticate(cls, email: str, password: str) -> dict:
         response: dict = cls._common_request(f"/tokens", method="POST", auth=(email, password))
@@ -135,37 +709,81 @@ class Server:
 
     @classmethod
     def segments(cls) -> dict:
-        response: dict = cls._common_request(f"/segments")
+        response: dict = cls._catalog_request(f"/segments")
         return response if response else dict()
 
     @classmethod
     def upload_segment(cls, blob_name) -> dict:
+        domain = current_user.domain if current_user.is_authenticated else None
         response: dict = cls._common_request(f"/segments/upload", method="POST", json={"blob_name": blob_name})
+        FieldCache.clear()
+        CatalogCache.invalidate(domain)
         return response
 
+    @classmethod
+    def upload_segments(cls, blob_names: List[str]) -> Dict[str, dict]:
+        # Backend contract: POST /segments/upload/batch with {"blob_names": [name, ...]} returns
+        # {"responses": {name: response, ...}} where each response is the same as that of POST /segments/upload.
+        # Blobs are sent UPLOAD_BATCH_SIZE at a time. If the backend does not support it (404 or 405) then each blob is
+        # uploaded individually and concurrently.
+        if not blob_names or not current_user.is_authenticated:
+            return {blob_name: dict() for blob_name in blob_names}
+        domain: str = current_user.domain
+        responses: Dict[str, dict] = dict()
+        for index in range(0, len(blob_names), Config.UPLOAD_BATCH_SIZE):
+            batch = blob_names[index:index + Config.UPLOAD_BATCH_SIZE]
+            response = cls._send_request(f"/segments/upload/batch", method="POST", json={"blob_names": batch}) \
+                if monotonic() >= cls._batch_upload_retry_at else None
+            if response is None or response.status_code in (404, 405):
+                if response is not None:
+                    cls._batch_upload_retry_at = monotonic() + Config.BATCH_RETRY_SECONDS
+                responses.update(zip(batch, cls.fan_out(*[partial(cls.upload_segment, name) for name in batch])))
+                continue
+            if response.status_code == 401 and current_user.is_authenticated:
+                flash("Session timeout. Please login again.")
+                logout_user()
+            found: dict = cls._parse_json(response).get("responses", dict()) if response.status_code == 200 \
+                else dict()
+            responses.update((blob_name, found.get(blob_name) or dict()) for blob_name in batch)
+            if not current_user.is_authenticated:
+                break
+        FieldCache.clear()
+        CatalogCache.invalidate(domain)
+        return responses
+
     @classmethod
     def macros(cls) -> List[str]:
-        response: dict = cls._common_request(f"/macros")
+        response: dict = cls._catalog_request(f"/macros")
         return response["macros"] if response else list()
 
     @classmethod
-    def instructions(cls, seg_name: str) -> dict:
-        response: dict = cls._common_request(f"/segments/{seg_name}/instructions")
-        instructions = response["instructions"] if response else list()
-        response["formatted_instructions"] = list()
-        for instruction in instructions:
-            ins_dict = dict()
-            ins = instruction.split(":")
-            ins_dict["index"] = ins[0]
-            ins_dict["label"] = ins[1]
-            ins_dict["command"] = ins[2]
-            ins_dict["operands"] = ins[3] if len(ins) > 3 else str()
-            ins_dict["supported"] = instruction not in response["not_supported"]
-            response["formatted_instructions"].append(ins_dict)
-        response["formatted_not_supported"] = [ins for ins in response["formatted_instructions"]
-                                               if not ins["supported"]]
+    def instructions(cls, seg_name: str, start: int = 0, count: Optional[int] = None) -> dict:
+        # Only the window start:start+count is formatted. The unsupported ones are formatted once per fetch.
+        response: dict = cls._catalog_request(f"/segments/{seg_name}/instructions", cls._prepare_instructions)
+        if not response:
+            response = {"instructions": list(), "not_supported": list(), "total_count": 0,
+                        "formatted_not_supported": list()}
+        instructions = response["instructions"]
+        not_supported = set(response["not_supported"])
+        end = len(instructions) if count is None else start + count
+        response["formatted_instructions"] = [cls._format_instruction(instruction, not_supported)
+                                              for instruction in instructions[start:end]]
         return response
 
+    @classmethod
+    def _prepare_instructions(cls, response: dict) -> None:
+        not_supported = set(response["not_supported"])
+        response["total_count"] = len(response["instructions"])
+        response["formatted_not_supported"] = [cls._format_instruction(instruction, not_supported)
+                                               for instruction in response["instructions"]
+                                               if instruction in not_supported]
+
+    @staticmethod
+    def _format_instruction(instruction: str, not_supported: set) -> dict:
+        ins = instruction.split(":")
+        return {"index": ins[0], "label": ins[1], "command": ins[2], "operands": ins[3] if len(ins) > 3 else str(),
+                "supported": instruction not in not_supported}
+
     @classmethod
     def unsupported_instructions(cls) -> dict:
         response: dict = cls._common_request(f"/unsupported_instructions")
@@ -173,26 +791,70 @@ class Server:
 
     @classmethod
     def symbol_table(cls, macro_name: str) -> List[dict]:
-        response: dict = cls._common_request(f"/macros/{macro_name}/symbol_table")
+        response: dict = cls._catalog_request(f"/macros/{macro_name}/symbol_table")
         return response["symbol_table"] if response else list()
 
     @classmethod
-    def get_all_test_data(cls) -> List[dict]:
-        response = cls._common_request(f"/test_data")
-        return response if response else list()
+    def get_all_test_data(cls, owner: str = str(), search: str = str(), sort: str = "name", descending: bool = False,
+                          cursor: str = str(), limit: int = Config.TEST_DATA_PAGE_SIZE) -> dict:
+        # Contract: GET /test_data?limit=&cursor=&sort=&order=asc|desc[&owner=][&search=] returns
+        # {"test_data": [headers of one page], "next_cursor": "<opaque, empty on the last page>", "total": <matches>}.
+        # A backend that ignores the parameters returns the full list and the page is cut here instead.
+        sort = sort if sort in Config.TEST_DATA_SORT_KEYS else "name"
+        params = {"limit": limit, "sort": sort, "order": "desc" if descending else "asc"}
+        if cursor:
+            params["cursor"] = cursor
+        if owner:
+            params["owner"] = owner
+        if search:
+            params["search"] = search
+        response = cls._common_request(f"/test_data", params=params)
+        if isinstance(response, dict):
+            return {"test_data": response.get("test_data", list()), "next_cursor": response.get("next_cursor", str()),
+                    "total": response.get("total", 0)}
+        return cls._paginate_test_data(response, owner, search, sort, descending, cursor, limit)
+
+    @staticmethod
+    def _paginate_test_data(test_data_list: List[dict], owner: str, search: str, sort: str, descending: bool,
+                            cursor: str, limit: int) -> dict:
+        # The cursor of the client side fallback is the offset of the next page
+        search = search.upper()
+        matches = [test_data for test_data in test_data_list if (not owner or test_data["owner"] == owner)
+                   and (not search or search in test_data["name"].upper())]
+        matches.sort(key=lambda test_data: str(test_data.get(sort, str())).upper(), reverse=descending)
+        start = int(cursor) if cursor.isdigit() else 0
+        end = start + limit
+        return {"test_data": matches[start:end], "next_cursor": str(end) if end < len(matches) else str(),
+                "total": len(matches)}
+
+    @classmethod
+    def get_test_data(cls, test_data_id: str) -> Union[TestData, dict]:
+        memo_key = ("test_data", test_data_id, current_user.get_id())
+        test_data: TestData = RequestMemo.get(memo_key)
+        if test_data:
+            return test_data
+        test_data = TestDataCache.get(test_data_id)
+        if test_data is not None:
+            RequestMemo.call_saved()
+        else:
+            test_data = cls._get_test_data(test_data_id)
+            TestDataCache.set(test_data_id, test_data)
+        RequestMemo.set(memo_key, test_data)
+        return test_data
 
     @classmethod
-    def get_test_data(cls, test_data_id: str) -> dict:
-        test_data: dict = cls._common_request(f"/test_data/{test_data_id}")
+    def _get_test_data(cls, test_data_id: str) -> Union[TestData, dict]:
+        test_data: dict = cls._common_request(f"/test_data/{test_data_id}", object_hook=FieldData.json_hook)
         if not test_data:
             return dict()
-        test_data["outputs"] = test_data["outputs"][0]
         test_data["class_display"] = "disabled" if test_data["owner"] != current_user.email else str()
         test_data["stop_seg_string"] = ", ".join(test_data["stop_segments"]) if test_data["stop_segments"] else str()
         test_data["cores"].sort(key=lambda item: (item["variation"], item["ecb_level"], item["heap_name"],
                                                   item["macro_name"], item["global_name"]))
         test_data["pnr"].sort(key=lambda item: (item["variation"], item["locator"], item["key"]))
-        return cls._decode_test_data(test_data)
+        test_data: TestData = cls._decode_test_data(test_data)
+        test_data.outputs = cls._decode_output(test_data.outputs[0], run=False)
+        return test_data
 
     @classmethod
     def get_test_data_by_name(cls, name: str) -> dict:
@@ -200,35 +862,75 @@ class Server:
         return cls._common_request(f"/test_data", params={"name": name})
 
     @classmethod
-    def run_test_data(cls, test_data_id: str) -> dict:
-        test_data: dict = cls._common_request(f"/test_data/{test_data_id}/run")
+    def run_test_data(cls, test_data_id: str) -> Union[TestData, dict]:
+        url = f"/test_data/{test_data_id}/run"
+        # Each output is decoded as soon as it is parsed when the response is streamed
+        test_data: dict = cls._stream_request(url, {"outputs": partial(cls._decode_output, run=True)}) \
+            if Config.STREAM_RUN_RESPONSE else cls._common_request(url, object_hook=LazyData.json_hook)
         if not test_data:
             return dict()
+        return cls._decode_run_test_data(test_data)
+
+    @classmethod
+    @Metrics.timed_decode
+    def _decode_run_test_data(cls, test_data: dict) -> TestData:
         test_data = cls._decode_test_data(test_data)
-        for output in test_data["outputs"]:
-            if "regs" in output and output["regs"]:
-                output["regs"] = cls._decode_regs(output["regs"])
-            if "cores" in output:
-                for core in output["cores"]:
-                    for field_data in core["field_data"]:
-                        field_data["data"] = cls._decode_data(field_data["data"])
-            if "pnr_outputs" in output:
-                for pnr_output in output["pnr_outputs"]:
-                    for field_data in pnr_output["field_data"]:
-                        field_data["data"] = cls._decode_data(field_data["data"])
-        fields = [field_data["field"] for core in test_data["outputs"][0]["cores"] for field_data in core["field_data"]]
-        pnr_fields = [field_data["field_text"] for pnr_output in test_data["outputs"][0]["pnr_outputs"]
-                      for field_data in pnr_output["field_data"]]
-        test_data["fields"] = fields
-        test_data["pnr_fields"] = pnr_fields
-        test_data["stop_seg_string"] = ", ".join(test_data["stop_segments"]) if test_data["stop_segments"] else \
+        test_data.outputs = [output if isinstance(output, Output) else cls._decode_output(output, run=True)
+                             for output in test_data.outputs]
+        test_data.fields = [field_data.field for core in test_data.outputs[0].cores for field_data in core.field_data]
+        test_data.pnr_fields = [field_data.field_text for pnr_output in test_data.outputs[0].pnr_outputs
+                                for field_data in pnr_output.field_data]
+        test_data.stop_seg_string = ", ".join(test_data.stop_segments) if test_data.stop_segments else \
             "No Stop Segments"
         return test_data
 
     @classmethod
     def search_field(cls, field_name: str) -> dict:
-        field_name = quote(field_name)
-        return cls._common_request(f"/fields/{field_name}")
+        cache_key = (current_user.domain, field_name) if current_user.is_authenticated else None
+        label_ref = FieldCache.get(cache_key) if cache_key else None
+        if label_ref:
+            return label_ref
+        label_ref = cls._common_request(f"/fields/{quote(field_name)}")
+        if label_ref and cache_key:
+            FieldCache.set(cache_key, label_ref)
+        return label_ref
+
+    @classmethod
+    def search_fields(cls, field_names: List[str]) -> Dict[str, dict]:
+        # Backend contract: POST /fields with {"fields": [name, ...]} returns {"fields": {name: label_ref, ...}} where
+        # label_ref is empty for names that are not found. If the backend does not support it (404 or 405) then each
+        # field is looked up individually and concurrently.
+        if not field_names or not current_user.is_authenticated:
+            return {field_name: dict() for field_name in field_names}
+        domain: str = current_user.domain
+        label_refs: Dict[str, dict] = dict()
+        pending: List[str] = list()
+        for field_name in dict.fromkeys(field_names):
+            label_ref = FieldCache.get((domain, field_name))
+            if label_ref:
+                label_refs[field_name] = label_ref
+            else:
+                pending.append(field_name)
+        if not pending:
+            return label_refs
+        response = cls._send_request(f"/fields", method="POST", json={"fields": pending}) \
+            if monotonic() >= cls._batch_fields_retry_at else None
+        if response is None or response.status_code in (404, 405):
+            if response is not None:
+                cls._batch_fields_retry_at = monotonic() + Config.BATCH_RETRY_SECONDS
+            found = cls.fan_out(*[partial(cls.search_field, field_name) for field_name in pending])
+            label_refs.update(zip(pending, found))
+            return label_refs
+        if response.status_code == 401 and current_user.is_authenticated:
+            flash("Session timeout. Please login again.")
+            logout_user()
+        found: dict = cls._parse_json(response).get("fields", dict()) if response.status_code == 200 else dict()
+        for field_name in pending:
+            label_ref = found.get(field_name) or dict()
+            if label_ref:
+                FieldCache.set((domain, field_name), label_ref)
+            label_refs[field_name] = label_ref
+        return label_refs
 
     @classmethod
     def create_test_data(cls, header: dict) -> Munch:
@@ -270,10 +972,16 @@ class Server:
         return cls._common_request(f"/test_data/{test_data_id}/input/macro/{macro_name}/variations/{variation}",
                                    method="PATCH", json=body)
 
+    @staticmethod
+    def _remove_cores(test_data: TestData, **match) -> None:
+        test_data["cores"] = [core for core in test_data.get("cores") or list()
+                              if any(core.get(key) != value for key, value in match.items())]
+
     @classmethod
     def delete_input_macro(cls, test_data_id: str, macro_name: str, variation: int) -> dict:
-        return cls._common_request(f"/test_data/{test_data_id}/input/macro/{macro_name}/variations/{variation}",
-                                   method="DELETE")
+        return cls._update_test_data(test_data_id,
+                                     f"/test_data/{test_data_id}/input/macro/{macro_name}/variations/{variation}",
+                                     "DELETE", partial(cls._remove_cores, macro_name=macro_name, variation=variation))
 
     @classmethod
     def add_input_heap(cls, test_data_id: str, body: dict) -> dict:
@@ -286,8 +994,9 @@ class Server:
 
     @classmethod
     def delete_input_heap(cls, test_data_id: str, heap_name: str, variation: int) -> dict:
-        return cls._common_request(f"/test_data/{test_data_id}/input/heap/{heap_name}/variations/{variation}",
-                                   method="DELETE")
+        return cls._update_test_data(test_data_id,
+                                     f"/test_data/{test_data_id}/input/heap/{heap_name}/variations/{variation}",
+                                     "DELETE", partial(cls._remove_cores, heap_name=heap_name, variation=variation))
 
     @classmethod
     def add_input_global(cls, test_data_id: str, body: dict) -> dict:
@@ -299,7 +1008,8 @@ class Server:
 
     @classmethod
     def delete_input_core(cls, test_data_id: str, core_id: str, ) -> dict:
-        return cls._common_request(f"/test_data/{test_data_id}/input/core/{core_id}", method="DELETE")
+        return cls._update_test_data(test_data_id, f"/test_data/{test_data_id}/input/core/{core_id}", "DELETE",
+                                     partial(cls._remove_cores, id=core_id))
 
     @classmethod
     def add_input_ecb_level(cls, test_data_id: str, body: dict) -> dict:
@@ -312,19 +1022,30 @@ class Server:
 
     @classmethod
     def delete_input_ecb_level(cls, test_data_id: str, ecb_level: str, variation: int) -> dict:
-        return cls._common_request(f"/test_data/{test_data_id}/input/ecb_level/{ecb_level}/variations/{variation}",
-                                   method="DELETE")
+        return cls._update_test_data(test_data_id,
+                                     f"/test_data/{test_data_id}/input/ecb_level/{ecb_level}/variations/{variation}",
+                                     "DELETE", partial(cls._remove_cores, ecb_level=ecb_level, variation=variation))
 
     @classmethod
     def add_input_regs(cls, test_data_id: str, reg_dict: dict) -> dict:
         reg_dict["value"] = int(reg_dict["value"], 16)
         if reg_dict["value"] > 0x7FFFFFFF:
             reg_dict["value"] -= Config.REG_MAX + 1
-        return cls._common_request(f"/test_data/{test_data_id}/input/regs", method="PATCH", json=reg_dict)
+
+        def patch(test_data: TestData) -> None:
+            regs = dict(test_data.get("regs") or dict(), **cls._decode_regs({reg_dict["reg"]: reg_dict["value"]}))
+            test_data["regs"] = {reg: regs[reg] for reg in Config.REGISTERS if reg in regs}
+
+        return cls._update_test_data(test_data_id, f"/test_data/{test_data_id}/input/regs", "PATCH", patch,
+                                     json=reg_dict)
 
     @classmethod
     def delete_input_regs(cls, test_data_id: str, reg: str) -> dict:
-        return cls._common_request(f"/test_data/{test_data_id}/input/regs/{reg}", method="DELETE")
+        def patch(test_data: TestData) -> None:
+            test_data["regs"] = {name: value for name, value in (test_data.get("regs") or dict()).items()
+                                 if name != reg}
+
+        return cls._update_test_data(test_data_id, f"/test_data/{test_data_id}/input/regs/{reg}", "DELETE", patch)
 
     @classmethod
     def add_output_pnr(cls, test_data_id: str, pnr_dict: dict) -> dict:
@@ -336,7 +1057,17 @@ class Server:
 
     @classmethod
     def delete_output_pnr(cls, test_data_id: str, pnr_id: str) -> dict:
-        return cls._common_request(f"/test_data/{test_data_id}/output/pnr/{pnr_id}", method="DELETE")
+        def patch(test_data: TestData) -> None:
+            outputs = test_data["outputs"]
+            outputs["pnr_outputs"] = [pnr_output for pnr_output in outputs.get("pnr_outputs") or list()
+                                      if pnr_output.get("id") != pnr_id]
+
+        return cls._update_test_data(test_data_id, f"/test_data/{test_data_id}/output/pnr/{pnr_id}", "DELETE", patch)
+
+    @staticmethod
+    def _remove_by_id(section: str, element_id: str, test_data: TestData) -> None:
+        test_data[section] = [element for element in test_data.get(section) or list()
+                              if element.get("id") != element_id]
 
     @classmethod
     def add_input_pnr(cls, test_data_id: str, pnr_dict: dict) -> dict:
@@ -348,7 +1079,8 @@ class Server:
 
     @classmethod
     def delete_input_pnr(cls, test_data_id: str, pnr_id: str) -> dict:
-        return cls._common_request(f"/test_data/{test_data_id}/input/pnr/{pnr_id}", method="DELETE")
+        return cls._update_test_data(test_data_id, f"/test_data/{test_data_id}/input/pnr/{pnr_id}", "DELETE",
+                                     partial(cls._remove_by_id, "pnr", pnr_id))
 
     @classmethod
     def add_tpfdf_lrec(cls, test_data_id: str, tpfdf: dict) -> dict:
@@ -356,7 +1088,8 @@ class Server:
 
     @classmethod
     def delete_tpfdf_lrec(cls, test_data_id: str, df_id: str) -> dict:
-        return cls._common_request(f"/test_data/{test_data_id}/input/tpfdf/{df_id}", method="DELETE")
+        return cls._update_test_data(test_data_id, f"/test_data/{test_data_id}/input/tpfdf/{df_id}", "DELETE",
+                                     partial(cls._remove_by_id, "tpfdf", df_id))
 
     @classmethod
     def add_fixed_file(cls, test_data_id: str, fixed_file: dict) -> dict:
@@ -364,7 +1097,8 @@ class Server:
 
     @classmethod
     def delete_fixed_file(cls, test_data_id: str, file_id: str) -> dict:
-        return cls._common_request(f"/test_data/{test_data_id}/input/fixed_files/{file_id}", method="DELETE")
+        return cls._update_test_data(test_data_id, f"/test_data/{test_data_id}/input/fixed_files/{file_id}", "DELETE",
+                                     partial(cls._remove_by_id, "fixed_files", file_id))
 
     @classmethod
     def add_debug(cls, test_data_id: str, debug: dict) -> dict:
@@ -372,7 +1106,12 @@ class Server:
 
     @classmethod
     def delete_debug(cls, test_data_id: str, seg_name: str) -> dict:
-        return cls._common_request(f"/test_data/{test_data_id}/output/debug/{seg_name}", method="DELETE")
+        def patch(test_data: TestData) -> None:
+            outputs = test_data["outputs"]
+            outputs["debug"] = [debug for debug in outputs.get("debug") or list() if debug != seg_name]
+
+        return cls._update_test_data(test_data_id, f"/test_data/{test_data_id}/output/debug/{seg_name}", "DELETE",
+                                     patch)
 
     @classmethod
     def get_variations(cls, test_data_id: str, variation_type: str) -> List[dict]:
@@ -476,8 +1215,16 @@ class Server:
         return cls._request_with_exception("/test_results")
 
     @classmethod
-    def get_test_result_by_name(cls, name: str) -> Munch:
-        return cls._request_with_exception("/test_results", params={"name": name})
+    def get_test_result_by_name(cls, name: str) -> TestResults:
+        test_results = TestResults(**cls._json_with_exception("/test_results", params={"name": name},
+                                                              object_hook=FieldData.json_hook))
+        for section, record in (("results", TestResult), ("cores", Core), ("pnr", Pnr), ("tpfdf", Tpfdf),
+                                ("files", ResultFile)):
+            if section in test_results and test_results[section]:
+                test_results[section] = [record(**item) for item in test_results[section]]
+        if "counters" in test_results:
+            test_results.counters = DefaultMunch.fromDict(test_results.counters, DefaultMunch())
+        return test_results
 
     @classmethod
     def update_comment(cls, test_result_id: str, body: dict) -> Munch:
@@ -491,3 +1238,12 @@ class Server:
     @classmethod
     def delete_test_result(cls, name: str) -> Munch:
         return cls._request_with_exception(f"/test_results/delete", method="DELETE", params={"name": name})
+
+
+Metrics.register_stats("tpf2_backend_pool", "Backend calls and connections of the session of this worker",
+                       ServerSession.stats)
+Metrics.register_stats("tpf2_field_cache", "Label lookups served from the cache of this worker", FieldCache.stats)
+Metrics.register_stats("tpf2_test_data_cache", "Test data served from the cache of this worker", TestDataCache.stats)
+Metrics.register_stats("tpf2_conditional_cache", "Backend documents revalidated by the cache of this worker",
+                       ConditionalCache.stats)
+Metrics.register_stats("tpf2_catalog_cache", "Catalogs served from the cache of this worker", CatalogCache.stats)
@@ -7,8 +7,11 @@ from config import Config
 from flask_app.form_prompts import PNR_KEY_PROMPT, PNR_LOCATOR_PROMPT, PNR_TEXT_PROMPT, PNR_INPUT_FIELD_DATA_PROMPT, \
     TEMPLATE_NAME_PROMPT, TEMPLATE_DESCRIPTION_PROMPT, VARIATION_PROMPT, VARIATION_NAME_PROMPT, GLOBAL_NAME_PROMPT, \
     IS_GLOBAL_RECORD_PROMPT, GLOBAL_HEX_DATA_PROMPT, GLOBAL_SEG_NAME_PROMPT, GLOBAL_FIELD_DATA_PROMPT, \
-    MACRO_FIELD_DATA_PROMPT, evaluate_error, init_body
-from flask_app.server import Server, RequestType
+    MACRO_FIELD_DATA_PROMPT, evaluate_error
+from flask_app.request_bodies import TemplatePnrCreateBody, TemplateGlobalCreateBody, TemplateAaaCreateBody, \
+    TemplatePnrAddBody, TemplateGlobalAddBody, TemplatePnrUpdateBody, TemplateGlobalUpdateBody, TemplateAaaUpdateBody, \
+    TemplateMergeLinkBody, TemplateLinkUpdateBody, ResultCommentUpdateBody, InvalidFormData
+from flask_app.server import Server
 from flask_app.template_constants import PNR, GLOBAL, AAA, LINK_UPDATE
 
 
@@ -26,8 +29,12 @@ class PnrCreateForm(FlaskForm):
         super().__init__(*args, **kwargs)
         self.response: Munch = Munch()
         if request.method == "POST":
-            body = init_body(self.data, RequestType.TEMPLATE_PNR_CREATE)
-            self.response = Server.create_new_pnr_template(body)
+            try:
+                body = TemplatePnrCreateBody.from_form(self.data)
+            except InvalidFormData as error:
+                self.response = error.response
+            else:
+                self.response = Server.create_new_pnr_template(body.to_dict())
 
     def validate_name(self, _):
         evaluate_error(self.response, "name", message=True)
@@ -63,8 +70,12 @@ class GlobalCreateForm(FlaskForm):
         super().__init__(*args, **kwargs)
         self.response: Munch = Munch()
         if request.method == "POST":
-            body = init_body(self.data, RequestType.TEMPLATE_GLOBAL_CREATE)
-            self.response = Server.create_new_global_template(body)
+            try:
+                body = TemplateGlobalCreateBody.from_form(self.data)
+            except InvalidFormData as error:
+                self.response = error.response
+            else:
+                self.response = Server.create_new_global_template(body.to_dict())
 
     def validate_name(self, _):
         evaluate_error(self.response, "name", message=True)
@@ -99,8 +110,12 @@ class AaaCreateForm(FlaskForm):
         super().__init__(*args, **kwargs)
         self.response: Munch = Munch()
         if request.method == "POST":
-            body = init_body(self.data, RequestType.TEMPLATE_AAA_CREATE)
-            self.response = Server.create_new_aaa_template(body)
+            try:
+                body = TemplateAaaCreateBody.from_form(self.data)
+            except InvalidFormData as error:
+                self.response = error.response
+            else:
+                self.response = Server.create_new_aaa_template(body.to_dict())
 
     def validate_name(self, _):
         evaluate_error(self.response, "name", message=True)
@@ -124,9 +139,12 @@ class PnrAddForm(FlaskForm):
         self.response: Munch = Munch()
         self.display_fields = [("Name", name)]
         if request.method == "POST":
-            body = init_body(self.data, RequestType.TEMPLATE_PNR_ADD)
-            body.name = name
-            self.response = Server.add_to_existing_pnr_template(body)
+            try:
+                body = TemplatePnrAddBody.from_form(self.data, name=name)
+            except InvalidFormData as error:
+                self.response = error.response
+            else:
+                self.response = Server.add_to_existing_pnr_template(body.to_dict())
 
     def validate_key(self, _):
         evaluate_error(self.response, ["key", "name"], message=True)
@@ -151,9 +169,12 @@ class GlobalAddForm(FlaskForm):
         self.response: Munch = Munch()
         self.display_fields = [("Name", name)]
         if request.method == "POST":
-            body = init_body(self.data, RequestType.TEMPLATE_GLOBAL_ADD)
-            body.name = name
-            self.response = Server.add_to_existing_global_template(body)
+            try:
+                body = TemplateGlobalAddBody.from_form(self.data, name=name)
+            except InvalidFormData as error:
+                self.response = error.response
+            else:
+                self.response = Server.add_to_existing_global_template(body.to_dict())
 
     def validate_global_name(self, _):
         evaluate_error(self.response, ["name", "global_name"], message=True)
@@ -188,8 +209,12 @@ class PnrUpdateForm(FlaskForm):
             self.text.data = template.text
             self.field_data.data = template.field_data
         if request.method == "POST":
-            body: dict = init_body(self.data, RequestType.TEMPLATE_PNR_UPDATE)
-            self.response = Server.update_pnr_template(template.id, body)
+            try:
+                body = TemplatePnrUpdateBody.from_form(self.data)
+            except InvalidFormData as error:
+                self.response = error.response
+            else:
+                self.response = Server.update_pnr_template(template.id, body.to_dict())
         return
 
     def validate_text(self, _):
@@ -218,8 +243,12 @@ class GlobalUpdateForm(FlaskForm):
             self.field_data.data = template.field_data
             self.seg_name.data = template.seg_name
         if request.method == "POST":
-            body = init_body(self.data, RequestType.TEMPLATE_GLOBAL_UPDATE)
-            self.response = Server.update_global_template(template.id, body)
+            try:
+                body = TemplateGlobalUpdateBody.from_form(self.data)
+            except InvalidFormData as error:
+                self.response = error.response
+            else:
+                self.response = Server.update_global_template(template.id, body.to_dict())
 
     def validate_is_global_record(self, _):
         evaluate_error(self.response, "is_global_record", message=True)
@@ -246,8 +275,12 @@ class AaaUpdateForm(FlaskForm):
         if request.method == "GET":
             self.field_data.data = template.field_data
         if request.method == "POST":
-            body = init_body(self.data, RequestType.TEMPLATE_AAA_UPDATE)
-            self.response = Server.update_aaa_template(template.id, body)
+            try:
+                body = TemplateAaaUpdateBody.from_form(self.data)
+            except InvalidFormData as error:
+                self.response = error.response
+            else:
+                self.response = Server.update_aaa_template(template.id, body.to_dict())
 
     def validate_field_data(self, _):
         evaluate_error(self.response, "field_data", message=True)
@@ -299,14 +332,19 @@ class TemplateMergeLinkForm(FlaskForm):
 
     def __init__(self, test_data_id: str, template_type: str, action_type: str, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # The merge is sent only once the choices are fetched, so that it is never sent for a request that fails
         rsp: Munch = Server.get_templates_and_test_data_variations(template_type, test_data_id)
         self.variation.choices = rsp.variation_choices
         self.template_name.choices = [(template.name, template.name) for template in rsp.templates]
         self.save.label.text = f"{action_type.title()} {self.save.label.text}"
         self.response: Munch = Munch()
         if request.method == "POST":
-            body = init_body(self.data, RequestType.TEMPLATE_MERGE_LINK)
-            self.response = Server.merge_link_template(test_data_id, body, template_type, action_type)
+            try:
+                body = TemplateMergeLinkBody.from_form(self.data)
+            except InvalidFormData as error:
+                self.response = error.response
+            else:
+                self.response = Server.merge_link_template(test_data_id, body.to_dict(), template_type, action_type)
 
     def validate_variation(self, _):
         evaluate_error(self.response, "variation", message=True)
@@ -331,12 +369,14 @@ class TemplateUpdateLinkForm(FlaskForm):
         self.new_template_name.choices = [(template.name, template.name) for template in templates]
         self.response = Munch()
         if request.method == "POST":
-            body = RequestType.TEMPLATE_LINK_UPDATE
-            body.template_name = element.template_name
-            body.variation = element.variation
-            body.new_template_name = self.new_template_name.data
-            self.response = Server.merge_link_template(element.test_data_id, body.__dict__, element.template_type,
-                                                       LINK_UPDATE)
+            try:
+                body = TemplateLinkUpdateBody.from_form(self.data, variation=element.variation,
+                                                        template_name=element.template_name)
+            except InvalidFormData as error:
+                self.response = error.response
+            else:
+                self.response = Server.merge_link_template(element.test_data_id, body.to_dict(),
+                                                           element.template_type, LINK_UPDATE)
         else:
             self.new_template_name.data = element.template_name
 
@@ -363,10 +403,12 @@ class CommentUpdateForm(FlaskForm):
             self.display_fields.append(ref[comment_type])
         self.response = Munch()
         if request.method == "POST":
-            body = RequestType.RESULT_COMMENT_UPDATE
-            body.comment_type = comment_type
-            body.comment = self.comment.data
-            self.response = Server.update_comment(test_result.id, body.__dict__)
+            try:
+                body = ResultCommentUpdateBody.from_form(self.data, comment_type=comment_type)
+            except InvalidFormData as error:
+                self.response = error.response
+            else:
+                self.response = Server.update_comment(test_result.id, body.to_dict())
         else:
             self.comment.data = test_result.get(comment_type)
 
@@ -5,7 +5,8 @@ from munch import Munch
 from werkzeug.utils import redirect
 
 from flask_app import tpf2_app
-from flask_app.server import Server, RequestType
+from flask_app.request_bodies import TemplateLinkDeleteBody
+from flask_app.server import Server
 from flask_app.template_constants import TemplateConstant, LINK_DELETE
 from flask_app.template_forms import TemplateRenameCopyForm, PnrCreateForm, PnrAddForm, PnrUpdateForm, \
     TemplateDeleteForm, GlobalCreateForm, GlobalAddForm, \
@@ -212,10 +213,8 @@ def update_link_template(test_data_id: str, template_type: str, t_name: str, var
 @cookie_login_required
 @error_check
 def delete_link_template(test_data_id: str, template_type: str, t_name: str, variation: int):
-    body = RequestType.TEMPLATE_LINK_DELETE
-    body.template_name = unquote(t_name)
-    body.variation = variation
-    response = Server.merge_link_template(test_data_id, body.__dict__, template_type, LINK_DELETE)
+    body = TemplateLinkDeleteBody(variation=variation, template_name=unquote(t_name))
+    response = Server.merge_link_template(test_data_id, body.to_dict(), template_type, LINK_DELETE)
     flash_message(response)
     anchor = TemplateConstant(template_type).anchor
     return redirect(url_for("confirm_test_data", test_data_id=test_data_id, _anchor=anchor))
@@ -13,8 +13,9 @@ from flask_app import tpf2_app
 from flask_app.form_prompts import OLD_FIELD_DATA_PROMPT, PNR_OUTPUT_FIELD_DATA_PROMPT, PNR_INPUT_FIELD_DATA_PROMPT, \
     PNR_KEY_PROMPT, PNR_LOCATOR_PROMPT, PNR_TEXT_PROMPT, VARIATION_PROMPT, VARIATION_NAME_PROMPT, GLOBAL_NAME_PROMPT, \
     IS_GLOBAL_RECORD_PROMPT, GLOBAL_HEX_DATA_PROMPT, GLOBAL_SEG_NAME_PROMPT, GLOBAL_FIELD_DATA_PROMPT, \
-    MACRO_FIELD_DATA_PROMPT, ECB_FIELD_DATA_PROMPT, evaluate_error, init_body
-from flask_app.server import Server, RequestType
+    MACRO_FIELD_DATA_PROMPT, ECB_FIELD_DATA_PROMPT, evaluate_error
+from flask_app.request_bodies import TestDataCreateBody, VariationRenameBody, InvalidFormData
+from flask_app.server import Server
 
 
 def form_validate_field_data(data: str) -> str:
@@ -50,8 +51,10 @@ def form_validate_multiple_field_data(data: str, macro_name: str) -> str:
     for key_value in data.split(","):
         if key_value.count(":") != 1:
             raise ValidationError(f"Include a single colon : to separate field and data - {key_value}")
+    label_refs = Server.search_fields([key_value.split(":")[0].strip().upper() for key_value in data.split(",")])
+    for key_value in data.split(","):
         field = key_value.split(":")[0].strip().upper()
-        label_ref = Server.search_field(field)
+        label_ref = label_refs[field]
         if not label_ref:
             raise ValidationError(f"Field name not found - {field}")
         if macro_name != label_ref["name"]:
@@ -61,6 +64,11 @@ def form_validate_multiple_field_data(data: str, macro_name: str) -> str:
     return ",".join(updated_field_data)
 
 
+def form_field_names(data: str) -> List[str]:
+    return [key_value.split(":")[0].strip().upper() for key_value in (data or str()).split(",")
+            if key_value.count(":") == 1]
+
+
 def form_field_lookup(data: str, macro_name: str) -> str:
     data = data.upper()
     label_ref = Server.search_field(data)
@@ -89,9 +97,13 @@ class TestDataForm(FlaskForm):
     def __init__(self, test_data: dict = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if request.method == "POST":
-            body = init_body(self.data, RequestType.TEST_DATA_CREATE)
-            self.response: Munch = Server.create_test_data(body) if not test_data \
-                else Server.rename_test_data(test_data["id"], body)
+            try:
+                body = TestDataCreateBody.from_form(self.data).to_dict()
+            except InvalidFormData as error:
+                self.response: Munch = error.response
+            else:
+                self.response = Server.create_test_data(body) if not test_data \
+                    else Server.rename_test_data(test_data["id"], body)
         if test_data and request.method == "GET":
             self.name.data = test_data["name"]
             self.seg_name.data = test_data["seg_name"]
@@ -646,6 +658,14 @@ class TpfdfForm(FlaskForm):
     field_data = TextAreaField(OLD_FIELD_DATA_PROMPT, render_kw={"rows": "5"}, validators=[InputRequired()])
     save = SubmitField("Save & Continue - Add Further Data")
 
+    def label_names(self) -> List[str]:
+        if not self.is_submitted():
+            return list()
+        field_names = form_field_names(self.field_data.data)
+        if self.macro_name.data:
+            field_names.append(self.macro_name.data.strip().upper())
+        return field_names
+
     @staticmethod
     def validate_macro_name(_, macro_name: StringField):
         macro_name.data = form_validate_macro_name(macro_name.data)
@@ -717,6 +737,25 @@ class FixedFileForm(FlaskForm):
                                          render_kw={"rows": "3"})
     save = SubmitField("Save & Continue - Add Further Data")
 
+    def label_names(self) -> List[str]:
+        if not self.is_submitted():
+            return list()
+        labels = [self.macro_name, self.fixed_fch_label, self.fixed_item_field, self.fixed_item_count,
+                  self.pool_macro_name, self.pool_index_field, self.pool_fch_label, self.pool_item_field,
+                  self.pool_item_count]
+        field_names = [label.data for label in labels if label.data]
+        if self.fixed_type.data and not self.fixed_type.data.isdigit():
+            field_names.append(self.fixed_type.data)
+        for field_data in (self.fixed_field_data, self.fixed_item_field_data, self.pool_field_data,
+                           self.pool_item_field_data):
+            field_names.extend(form_field_names(field_data.data))
+        return [field_name.strip().upper() for field_name in field_names if field_name.strip()]
+
+    def validate(self, *args, **kwargs) -> bool:
+        # Look up every label in the form with a single round trip so that the field validators are served from cache
+        Server.search_fields(self.label_names())
+        return super().validate(*args, **kwargs)
+
     @staticmethod
     def _validate_record_id(data: str) -> str:
         if len(data) != 2 and len(data) != 4:
@@ -876,11 +915,15 @@ class RenameCopyVariation(FlaskForm):
             if action == "copy":
                 self.new_name.data = f"{self.new_name.data} - Copy"
         if request.method == "POST":
-            body = {"new_name": self.new_name.data}
-            if action == "rename":
-                self.response = Server.rename_variation(test_data_id, v_type, td_element["variation"], body)
+            try:
+                body = VariationRenameBody.from_form(self.data).to_dict()
+            except InvalidFormData as error:
+                self.response = error.response
             else:
-                self.response = Server.copy_variation(test_data_id, v_type, td_element["variation"], body)
+                if action == "rename":
+                    self.response = Server.rename_variation(test_data_id, v_type, td_element["variation"], body)
+                else:
+                    self.response = Server.copy_variation(test_data_id, v_type, td_element["variation"], body)
 
     def validate_new_name(self, _):
         if "error" in self.response and self.response["error"]:
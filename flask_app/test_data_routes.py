@@ -1,5 +1,5 @@
 from base64 import b64encode
-from functools import wraps
+from functools import wraps, partial
 from urllib.parse import unquote
 
 from flask import render_template, url_for, redirect, flash, request, Response
@@ -8,7 +8,7 @@ from werkzeug.datastructures import MultiDict
 from wtforms import BooleanField
 
 from flask_app import tpf2_app
-from flask_app.server import Server
+from flask_app.server import Server, RequestMemo
 from flask_app.template_forms import CommentUpdateForm, SaveResultForm
 from flask_app.test_data_forms import DeleteForm, TestDataForm, FieldSearchForm, FieldLengthForm, \
     RegisterForm, RegisterFieldDataForm, TpfdfForm, DebugForm, \
@@ -32,6 +32,14 @@ def test_data_required(func):
     return test_data_wrapper
 
 
+@tpf2_app.after_request
+def add_backend_calls_saved(response: Response) -> Response:
+    calls_saved = RequestMemo.calls_saved()
+    if calls_saved:
+        response.headers["X-Backend-Calls-Saved"] = str(calls_saved)
+    return response
+
+
 def _search_field(redirect_route: str, test_data_id: str):
     form = FieldSearchForm()
     if not form.validate_on_submit():
@@ -46,23 +54,30 @@ def _convert_field_data(form_data: str) -> list:
             for data in form_data.split(",") if data]
 
 
+def _render_test_data_list(title: str, all_flag: bool, owner: str = str()):
+    sort = request.args.get("sort", "name")
+    descending = request.args.get("order", "asc") == "desc"
+    search = request.args.get("search", str()).strip()
+    cursor = request.args.get("cursor", str())
+    start = request.args.get("start", 0, type=int)
+    page = Server.get_all_test_data(owner=owner, search=search, sort=sort, descending=descending, cursor=cursor)
+    if not current_user.is_authenticated:
+        return redirect(url_for("logout"))
+    return render_template("test_data_list.html", title=title, test_data_list=page["test_data"], all_flag=all_flag,
+                           next_cursor=page["next_cursor"], total=page["total"], start=start, sort=sort,
+                           descending=descending, search=search, list_endpoint=request.endpoint)
+
+
 @tpf2_app.route("/test_data")
 @cookie_login_required
 def get_all_test_data():
-    test_data_list = Server.get_all_test_data()
-    if not current_user.is_authenticated:
-        return redirect(url_for("logout"))
-    return render_template("test_data_list.html", title="All Test Data", test_data_list=test_data_list, all_flag=True)
+    return _render_test_data_list("All Test Data", all_flag=True)
 
 
 @tpf2_app.route("/my_test_data")
 @cookie_login_required
 def get_my_test_data():
-    test_data_list = Server.get_all_test_data()
-    if not current_user.is_authenticated:
-        return redirect(url_for("logout"))
-    my_list = [test_data for test_data in test_data_list if test_data["owner"] == current_user.email]
-    return render_template("test_data_list.html", title="Test Data", test_data_list=my_list, all_flag=False)
+    return _render_test_data_list("Test Data", all_flag=False, owner=current_user.email)
 
 
 @tpf2_app.route("/test_data/<string:test_data_id>", methods=["GET", "POST"])
@@ -520,7 +535,8 @@ def delete_input_pnr(test_data_id: str, pnr_input_id: str):
 @cookie_login_required
 def add_tpfdf_lrec(test_data_id: str):
     form = TpfdfForm()
-    variations = Server.get_variations(test_data_id, "tpfdf")
+    variations = Server.fan_out(partial(Server.get_variations, test_data_id, "tpfdf"),
+                                partial(Server.search_fields, form.label_names()))[0]
     if not current_user.is_authenticated:
         return redirect(url_for("logout"))
     form.variation.choices = [(item["variation"], f"{item['variation_name']} ({item['variation']})")
@@ -560,7 +576,8 @@ def delete_tpfdf_lrec(test_data_id: str, df_id: str):
 @cookie_login_required
 def add_fixed_file(test_data_id: str):
     form = FixedFileForm()
-    variations = Server.get_variations(test_data_id, "file")
+    variations = Server.fan_out(partial(Server.get_variations, test_data_id, "file"),
+                                partial(Server.search_fields, form.label_names()))[0]
     if not current_user.is_authenticated:
         return redirect(url_for("logout"))
     form.variation.choices = [(item["variation"], f"{item['variation_name']} ({item['variation']})")
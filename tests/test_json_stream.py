@@ -0,0 +1,81 @@
+import json
+import unittest
+from json import JSONDecodeError
+
+from flask_login import login_user
+
+from benchmarks.backend import StandInBackend, BackendOptions, serve_in_thread
+from benchmarks.payloads import run_test_data_payload
+from benchmarks.run_test_data_memory import buffered, streamed
+from config import Config
+from flask_app import tpf2_app
+from flask_app.json_stream import JsonStream
+from flask_app.records import Output
+from flask_app.server import Server
+from flask_app.user import User
+
+# Bodies parsed while they are read and runs of test data decoded one output at a time.
+#   python -m pytest tests
+
+
+def chunks(body: bytes, size: int):
+    return (body[index:index + size] for index in range(0, len(body), size))
+
+
+def decoded(test_data) -> dict:
+    # What is shown of a run, with the field data decoded
+    return {"fields": test_data.fields, "pnr_fields": test_data.pnr_fields, "outputs": [
+        {"regs": output.regs, "variation_name": output.variation_name,
+         "cores": [[(field_data.field, list(field_data.data)) for field_data in core.field_data]
+                   for core in output.cores]} for output in test_data.outputs]}
+
+
+class JsonStreamTest(unittest.TestCase):
+    DOCUMENT = {"id": "id", "count": 12345, "values": [1, 2.5e3, "x", None, True, {"text": "é€😀"}],
+                "outputs": [{"index": index, "text": "é" * index} for index in range(20)], "empty": list(),
+                "number": -0.125}
+
+    def test_load(self):
+        body = json.dumps(self.DOCUMENT, ensure_ascii=False).encode()
+        for size in (1, 2, 3, 7, 64, len(body)):
+            with self.subTest(size=size):
+                self.assertEqual(self.DOCUMENT, JsonStream(chunks(body, size)).load(dict()))
+                values = JsonStream(chunks(body, size)).load({"outputs": lambda output: output["index"],
+                                                              "empty": lambda item: item})
+                self.assertEqual(dict(self.DOCUMENT, outputs=list(range(20))), values)
+
+    def test_invalid(self):
+        for body in (b"", b"[1]", b'{"a": 1', b'{"a": 1}x', b'{"a" 1}', b'{1: 2}', b'{"outputs": [1,]}'):
+            with self.subTest(body=body):
+                with self.assertRaises(JSONDecodeError):
+                    JsonStream(chunks(body, 2)).load({"outputs": lambda output: output})
+
+    def test_run_test_data(self):
+        body = json.dumps(run_test_data_payload(variations=5, cores=2, fields=5)).encode()
+        test_data = streamed(body)
+        self.assertTrue(all(isinstance(output, Output) for output in test_data.outputs))
+        self.assertEqual(decoded(buffered(body)), decoded(test_data))
+
+
+class RunTestDataTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.backend = StandInBackend(BackendOptions(test_data_count=1, variations=3))
+        cls.backend_server, Config.SERVER_URL = serve_in_thread(cls.backend)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.backend_server.shutdown()
+
+    def test_streamed(self):
+        with tpf2_app.test_request_context():
+            login_user(User(email=self.backend.headers[0]["owner"], api_key="token", domain="general"))
+            test_data = Server.run_test_data(self.backend.headers[0]["id"])
+            self.assertEqual(3, len(test_data.outputs))
+            self.assertEqual(self.backend.options.cores * self.backend.options.fields, len(test_data.fields))
+            self.assertEqual(dict(), Server.run_test_data("unknown_id"))
+
+
+if __name__ == "__main__":
+    unittest.main()
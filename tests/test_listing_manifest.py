@@ -0,0 +1,44 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from config import Config
+from flask_app import tpf2_app
+from flask_app.forms import ListingManifest
+
+# The listing manifest kept in a local directory standing in for the manifest bucket.
+#   python -m pytest tests
+
+
+class ListingManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.local_bucket_path = Config.LOCAL_BUCKET_PATH
+        Config.LOCAL_BUCKET_PATH = self.directory.name
+        self.context = tpf2_app.app_context()
+        self.context.push()
+
+    def tearDown(self):
+        self.context.pop()
+        Config.LOCAL_BUCKET_PATH = self.local_bucket_path
+        self.directory.cleanup()
+
+    def test_update(self):
+        self.assertEqual(dict(), ListingManifest.load("listings", "general"))
+        ListingManifest.update("listings", "general", {"abcd.lst": ListingManifest.entry("hash1", 10)})
+        ListingManifest.update("listings", "general", {"efgh.lst": ListingManifest.entry("hash2", 20)})
+        self.assertEqual({"abcd.lst": {"hash": "hash1", "size": 10}, "efgh.lst": {"hash": "hash2", "size": 20}},
+                         ListingManifest.load("listings", "general"))
+        self.assertEqual(dict(), ListingManifest.load("listings", "sabre"))
+
+    def test_bucket_not_accessible(self):
+        # A file in place of the manifest bucket cannot be read or written, like a bucket that is missing
+        with open(os.path.join(self.directory.name, Config.MANIFEST_BUCKET), "w") as file:
+            file.write(str())
+        ListingManifest.update("listings", "general", {"abcd.lst": ListingManifest.entry("hash1", 10)})
+        self.assertEqual(dict(), ListingManifest.load("listings", "general"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from flask_app.request_bodies import TemplateMergeLinkBody, TemplateGlobalAddBody, InvalidFormData
+
+# Bodies built from the data of a form, which may have values that are missing or of the wrong type.
+#   python -m pytest tests
+
+
+class RequestBodyTest(unittest.TestCase):
+    FORM_DATA = {"variation": 1, "variation_name": "Variation 1", "template_name": "TEMPLATE", "csrf_token": "x"}
+
+    def test_valid(self):
+        body = TemplateMergeLinkBody.from_form(self.FORM_DATA)
+        self.assertEqual({"variation": 1, "variation_name": "Variation 1", "template_name": "TEMPLATE"}, body.to_dict())
+
+    def test_missing_value(self):
+        form_data = dict(self.FORM_DATA)
+        del form_data["variation"]
+        with self.assertRaises(InvalidFormData) as context:
+            TemplateMergeLinkBody.from_form(form_data)
+        self.assertTrue(context.exception.response.error)
+        self.assertEqual(str(), context.exception.response.message)
+        self.assertEqual({"variation": "This field is required."}, context.exception.response.error_fields)
+
+    def test_invalid_values(self):
+        for field_name, value in (("variation", "1"), ("variation", True), ("variation", 1.0), ("template_name", 1)):
+            with self.subTest(field_name=field_name, value=value):
+                with self.assertRaises(InvalidFormData) as context:
+                    TemplateMergeLinkBody.from_form(dict(self.FORM_DATA, **{field_name: value}))
+                self.assertEqual({field_name: "Not a valid value."}, context.exception.response.error_fields)
+
+    def test_invalid_bool(self):
+        form_data = {"name": "GLOBAL", "global_name": "@AA", "is_global_record": "y", "hex_data": str(),
+                     "seg_name": str(), "field_data": str()}
+        with self.assertRaises(InvalidFormData) as context:
+            TemplateGlobalAddBody.from_form(form_data)
+        self.assertEqual({"is_global_record": "Not a valid value."}, context.exception.response.error_fields)
+        self.assertTrue(TemplateGlobalAddBody.from_form(dict(form_data, is_global_record=True)).is_global_record)
+
+    def test_invalid_keyword_value(self):
+        # Values that are not from the form are shown as the message of the form
+        with self.assertRaises(InvalidFormData) as context:
+            TemplateMergeLinkBody.from_form(self.FORM_DATA, template_name=None)
+        self.assertEqual("This field is required.", context.exception.response.message)
+        self.assertEqual(dict(), context.exception.response.error_fields)
+
+    def test_keyword_value_replaces_form_value(self):
+        body = TemplateMergeLinkBody.from_form(self.FORM_DATA, template_name="OTHER")
+        self.assertEqual("OTHER", body.template_name)
+
+    def test_invalid_form_data_is_type_error(self):
+        with self.assertRaises(TypeError):
+            TemplateMergeLinkBody.from_form(dict())
+        with self.assertRaises(TypeError):
+            TemplateMergeLinkBody(variation="1", variation_name="Variation 1", template_name="TEMPLATE")
+
+
+if __name__ == "__main__":
+    unittest.main()
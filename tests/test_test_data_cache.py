@@ -0,0 +1,131 @@
+import unittest
+
+from flask_login import login_user
+
+from benchmarks.backend import StandInBackend, BackendOptions, serve_in_thread
+from config import Config
+from flask_app import tpf2_app, records
+from flask_app.records import Output
+from flask_app.server import Server, TestDataCache
+from flask_app.user import User
+
+# Changes of the test data sent to the stand-in backend (which accepts all of them) and the cached test data that is
+# patched, served or invalidated as a result.
+#   python -m pytest tests
+
+
+class TestDataCacheTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.backend = StandInBackend(BackendOptions(test_data_count=1))
+        cls.backend_server, Config.SERVER_URL = serve_in_thread(cls.backend)
+        cls.test_data_id = cls.backend.headers[0]["id"]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.backend_server.shutdown()
+
+    def setUp(self):
+        self.context = tpf2_app.test_request_context()
+        self.context.push()
+        login_user(User(email=self.backend.headers[0]["owner"], api_key="token", domain="general"))
+
+    def tearDown(self):
+        self.context.pop()
+
+    def test_patched_test_data_is_served_once(self):
+        regs = Server._decode_regs({"R1": 1, "R2": 2})
+        TestDataCache.set(self.test_data_id, records.TestData(id=self.test_data_id, regs=regs, outputs=Output()))
+        self.assertIsNone(TestDataCache.get(self.test_data_id))
+        Server.delete_input_regs(self.test_data_id, "R1")
+        self.assertTrue(TestDataCache.contains(self.test_data_id))
+        self.assertEqual(["R2"], list(TestDataCache.get(self.test_data_id).regs))
+        self.assertIsNone(TestDataCache.get(self.test_data_id))
+        self.assertEqual(["R2"], list(TestDataCache.base(self.test_data_id).regs))
+        self.assertEqual(["R1", "R2"], list(regs))
+
+    def test_entries_are_copies(self):
+        test_data = records.TestData(id=self.test_data_id, regs=Server._decode_regs({"R1": 1}))
+        TestDataCache.set(self.test_data_id, test_data)
+        test_data.regs["R2"] = ["00000002", 2]
+        base = TestDataCache.base(self.test_data_id)
+        base.regs.clear()
+        self.assertEqual(["R1"], list(TestDataCache.base(self.test_data_id).regs))
+        Server.delete_input_regs(self.test_data_id, "R2")
+        patched = TestDataCache.get(self.test_data_id)
+        patched.regs["R3"] = ["00000003", 3]
+        self.assertEqual(["R1"], list(TestDataCache.base(self.test_data_id).regs))
+
+    def test_missing_regs(self):
+        TestDataCache.set(self.test_data_id, records.TestData(id=self.test_data_id))
+        Server.delete_input_regs(self.test_data_id, "R1")
+        self.assertEqual(dict(), TestDataCache.get(self.test_data_id).regs)
+        Server.add_input_regs(self.test_data_id, {"reg": "R3", "value": "0000000A"})
+        self.assertEqual({"R3": ["0000000A", 10]}, TestDataCache.get(self.test_data_id).regs)
+
+    def test_missing_outputs(self):
+        TestDataCache.set(self.test_data_id, records.TestData(id=self.test_data_id))
+        response = Server.delete_output_pnr(self.test_data_id, "pnr_id")
+        self.assertFalse(response.get("error"))
+        self.assertIsNone(TestDataCache.get(self.test_data_id))
+        self.assertIsNone(TestDataCache.base(self.test_data_id))
+
+    def test_missing_output_sections(self):
+        outputs = Output()
+        TestDataCache.set(self.test_data_id, records.TestData(id=self.test_data_id, outputs=outputs))
+        Server.delete_output_pnr(self.test_data_id, "pnr_id")
+        self.assertEqual(list(), TestDataCache.get(self.test_data_id).outputs.pnr_outputs)
+        Server.delete_debug(self.test_data_id, "ETA1")
+        test_data = TestDataCache.get(self.test_data_id)
+        self.assertEqual(list(), test_data.outputs.debug)
+        self.assertEqual(list(), test_data.outputs.pnr_outputs)
+        self.assertNotIn("debug", outputs)
+
+    def test_other_change_invalidates(self):
+        TestDataCache.set(self.test_data_id, records.TestData(id=self.test_data_id, outputs=Output()))
+        Server.add_input_heap(self.test_data_id, {"heap_name": "TEST", "variation": 0})
+        self.assertIsNone(TestDataCache.base(self.test_data_id))
+        self.assertIsNone(TestDataCache.get(self.test_data_id))
+
+    def test_rejected_change_is_not_patched(self):
+        TestDataCache.set(self.test_data_id, records.TestData(id=self.test_data_id, regs=dict()))
+        Server.delete_input_regs("unknown_id", "R1")
+        self.assertIsNone(TestDataCache.get(self.test_data_id))
+        self.assertIsNone(TestDataCache.base("unknown_id"))
+
+
+class TestDataViewTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.backend = StandInBackend(BackendOptions(test_data_count=1))
+        cls.backend_server, Config.SERVER_URL = serve_in_thread(cls.backend)
+        cls.test_data_id = cls.backend.headers[0]["id"]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.backend_server.shutdown()
+
+    def setUp(self):
+        self.csrf_enabled = tpf2_app.config.get("WTF_CSRF_ENABLED", True)
+        tpf2_app.config["WTF_CSRF_ENABLED"] = False
+        self.client = tpf2_app.test_client()
+        self.client.post("/login", data={"email": self.backend.headers[0]["owner"], "password": "password"})
+
+    def tearDown(self):
+        tpf2_app.config["WTF_CSRF_ENABLED"] = self.csrf_enabled
+
+    def test_views_keep_the_session(self):
+        self.assertIn("Set-Cookie", self.client.get(f"/test_data/{self.test_data_id}").headers)
+        for _ in range(2):
+            response = self.client.get(f"/test_data/{self.test_data_id}")
+            self.assertEqual(200, response.status_code)
+            self.assertNotIn("Set-Cookie", response.headers)
+        response = self.client.get(f"/test_data/{self.test_data_id}/input/regs/R1")
+        self.assertIn("Set-Cookie", response.headers)
+        self.assertEqual(200, self.client.get(f"/test_data/{self.test_data_id}/confirm").status_code)
+
+
+if __name__ == "__main__":
+    unittest.main()